@@ -1,31 +1,90 @@
 # Импорт необходимых библиотек
-from flask import Flask, render_template, request  # Flask для веб-приложения, render_template для шаблонов, request для обработки запросов
-import requests  # Для выполнения HTTP-запросов к API
+from flask import Flask, Blueprint, current_app, jsonify, render_template, request  # Flask для веб-приложения, render_template для шаблонов, request для обработки запросов
+import atexit  # Для сохранения снимка кэша при остановке воркера
+import logging  # Для журнала сохранения снимка кэша
 import os  # Для работы с переменными окружения
+import threading  # Для потокобезопасного доступа к кэшу ответов
+import time  # Для замера задержки вызовов upstream
+from collections import OrderedDict  # Для LRU-кэша ответов модели
 
-# Создание экземпляра Flask приложения
-app = Flask(__name__, template_folder='templates')  # Указываем папку с шаблонами
+from prompts import estimate_tokens, get_prompt, record_metric  # Скомпилированные шаблоны промптов и их метрики
+from tenants import (  # Ключи upstream, учет использования и лимиты по клиентам
+    DEFAULT_TENANT, RateLimitExceeded, TenantLimiter, UpstreamConfig, UsageStore,
+)
+from warmup import WarmupState  # Состояние прогрева для эндпоинта готовности
+
+# Тяжелые зависимости (requests, incremental, pipeline) импортируются при первом
+# использовании или при прогреве, а не при импорте модуля (см. __getattr__ ниже)
+
+logger = logging.getLogger(__name__)
+
+# Blueprint с роутами приложения; сам Flask-объект создается фабрикой create_app
+bp = Blueprint('main', __name__)
 
 # URL эндпоинта API
 API_ENDPOINT = "https://api.mentorpiece.org/v1/process-ai-request"
 
+# Конфигурация upstream (ключи, лимиты клиентов) загружается один раз при импорте
+UPSTREAM_CONFIG = UpstreamConfig.from_env()
+_tenant_limiter = TenantLimiter(UPSTREAM_CONFIG)
+_usage = UsageStore(os.getenv('USAGE_LOG_PATH'))
+
+# Размер LRU-кэша ответов модели (0 — кэш выключен)
+RESPONSE_CACHE_SIZE = int(os.getenv('RESPONSE_CACHE_SIZE', '0'))
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+# Общая HTTP-сессия с пулом соединений; создается при прогреве (см. get_session)
+_session = None
+_session_lock = threading.Lock()
+
+# Память переводов для инкрементального режима (результаты по result_id); создается при первом обращении
+_translation_memory = None
+_translation_memory_lock = threading.Lock()
+
+# Снимки кэша, для которых уже зарегистрировано сохранение при остановке
+_snapshot_exit_paths = set()
+
+# Экземпляр приложения для `from app import app`; создается при первом обращении (см. __getattr__)
+_default_app_lock = threading.Lock()
+
+# Префиксы, с которых call_llm начинает сообщения об ошибках
+ERROR_PREFIXES = ("Ошибка", "Сетевая ошибка", "Ответ не найден")
+
 # Вспомогательная функция для вызова LLM
-def call_llm(model_name, messages):
+def call_llm(model_name, messages, tenant=DEFAULT_TENANT):
     """
     Функция для отправки запроса к API LLM.
     
     Параметры:
     - model_name (str): Имя модели, например "Qwen/Qwen3-VL-30B-A3B-Instruct"
     - messages (list): Список сообщений, но в данном API это просто prompt
+    - tenant (str): Клиент, от имени которого идет вызов (определяет ключ и лимиты)
     
     Возвращает:
     - str: Ответ от модели или сообщение об ошибке
     """
-    # Загрузка API ключа из переменных окружения
-    api_key = os.getenv('API_KEY')
+    # Ключ API клиента из конфигурации, загруженной при старте
+    api_key = UPSTREAM_CONFIG.key_for(tenant)
     if not api_key:
-        return "Ошибка: API ключ не найден в переменных окружения."
+        return "Ошибка: API ключ не настроен для клиента (API_KEY, API_KEYS или TENANT_KEYS)."
     
+    # Справедливая доля параллелизма: ждем свободный слот upstream для клиента
+    # (вызов ограничен таймаутом, поэтому зависший upstream не держит слот вечно)
+    if not _tenant_limiter.acquire(tenant):
+        return "Ошибка: upstream перегружен, попробуйте позже."
+    started = time.perf_counter()
+    try:
+        result = _post_to_upstream(model_name, messages, api_key)
+    finally:
+        _tenant_limiter.release(tenant)
+    _usage.record(tenant, estimate_tokens(str(messages)), estimate_tokens(str(result)),
+                  time.perf_counter() - started, error=is_error_response(result))
+    return result
+
+
+def _post_to_upstream(model_name, messages, api_key):
+    """Выполняет HTTP-запрос к API и возвращает ответ модели или сообщение об ошибке."""
     # Подготовка данных для запроса
     data = {
         "model_name": model_name,
@@ -38,9 +97,13 @@ def call_llm(model_name, messages):
         "Authorization": f"Bearer {api_key}"  # Добавляем API ключ в заголовки
     }
     
+    import requests  # Уже загружен при прогреве; иначе — при первом вызове
+
     try:
-        # Отправка POST запроса
-        response = requests.post(API_ENDPOINT, json=data, headers=headers)
+        # Отправка POST запроса (через прогретый пул соединений, если он уже создан)
+        post = _session.post if _session is not None else requests.post
+        response = post(API_ENDPOINT, json=data, headers=headers,
+                        timeout=UPSTREAM_CONFIG.request_timeout)
         
         # Проверка статуса ответа
         if response.status_code == 200:
@@ -54,8 +117,444 @@ def call_llm(model_name, messages):
         # Обработка сетевых ошибок
         return f"Сетевая ошибка: {str(e)}"
 
+
+def get_session(pool_size=10):
+    """
+    Возвращает общую HTTP-сессию с пулом соединений, создавая ее при первом вызове.
+
+    Параметры:
+    - pool_size (int): Максимальное количество соединений в пуле
+
+    Возвращает:
+    - requests.Session: Сессия, которую использует call_llm
+    """
+    import requests
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def is_error_response(text):
+    """Проверяет, является ли ответ call_llm сообщением об ошибке."""
+    return text.startswith(ERROR_PREFIXES)
+
+
+def call_prompt(prompt, tenant=DEFAULT_TENANT):
+    """
+    Отправляет отрендеренный промпт в модель с учетом кэша ответов.
+
+    Ключ кэша включает тег версии шаблона, поэтому смена шаблона не отдает
+    устаревшие ответы. Ошибки не кэшируются.
+
+    Параметры:
+    - prompt (RenderedPrompt): Промпт, полученный из prompts.get_prompt(...).render(...)
+    - tenant (str): Клиент, от имени которого идет вызов
+
+    Возвращает:
+    - str: Ответ от модели или сообщение об ошибке
+    """
+    key = prompt.cache_key if RESPONSE_CACHE_SIZE > 0 else None
+    if key is not None:
+        with _response_cache_lock:
+            cached = _response_cache.get(key)
+            if cached is not None:
+                _response_cache.move_to_end(key)
+                record_metric(prompt.tag, 'cache_hits')
+                return cached
+
+    record_metric(prompt.tag, 'upstream_calls')
+    result = call_llm(prompt.model, prompt.text, tenant=tenant)
+    if is_error_response(result):
+        record_metric(prompt.tag, 'errors')
+    elif key is not None:
+        with _response_cache_lock:
+            _response_cache[key] = result
+            if len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+    return result
+
+def preload_response_cache(path):
+    """
+    Заполняет кэш ответов из локального снимка.
+
+    Параметры:
+    - path (str): Путь к JSON-файлу снимка (см. save_response_cache)
+
+    Возвращает:
+    - int: Количество загруженных записей
+
+    Исключения:
+    - ValueError: Если кэш ответов выключен (RESPONSE_CACHE_SIZE=0)
+    """
+    from warmup import load_snapshot
+
+    if RESPONSE_CACHE_SIZE <= 0:
+        raise ValueError(f"Кэш ответов выключен (RESPONSE_CACHE_SIZE=0), снимок {path} не загружен")
+    entries = load_snapshot(path)
+    with _response_cache_lock:
+        # Берем последние записи снимка, если он больше кэша
+        for key, value in list(entries.items())[-RESPONSE_CACHE_SIZE:]:
+            _response_cache[key] = value
+            _response_cache.move_to_end(key)
+        while len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+    return min(len(entries), RESPONSE_CACHE_SIZE)
+
+
+def save_response_cache(path):
+    """
+    Сохраняет текущее содержимое кэша ответов в локальный снимок.
+
+    Параметры:
+    - path (str): Путь к JSON-файлу снимка
+    """
+    from warmup import save_snapshot
+
+    with _response_cache_lock:
+        entries = dict(_response_cache)
+    save_snapshot(path, entries)
+
+
+def _save_response_cache_on_exit(path):
+    """Сохраняет снимок кэша при остановке процесса; пустой кэш не затирает прежний снимок."""
+    if not _response_cache:
+        return
+    try:
+        save_response_cache(path)
+    except OSError as e:
+        logger.warning("Не удалось сохранить снимок кэша ответов %s: %s", path, e)
+
+
+def warm_up(flask_app, state):
+    """
+    Прогревает воркер перед приемом трафика.
+
+    Шаги: компиляция Jinja-шаблона, импорт модулей включенных режимов,
+    DNS-резолв upstream, открытие соединений в пуле и (опционально) загрузка
+    кэша ответов из снимка. Ошибки шагов
+    сохраняются в state.errors, но не прерывают прогрев.
+
+    Параметры:
+    - flask_app (Flask): Приложение, созданное create_app
+    - state (WarmupState): Состояние прогрева этого приложения
+    """
+    from warmup import resolve_host, prewarm_connections
+
+    config = flask_app.config
+    state.run_step('templates', flask_app.jinja_env.get_template, 'index.html')
+    if config.get('INCREMENTAL_TRANSLATION') or config.get('PIPELINED_JUDGING'):
+        state.run_step('imports', _import_mode_modules, config)
+    state.run_step('dns', resolve_host, API_ENDPOINT)
+    session = get_session(pool_size=config['HTTP_POOL_SIZE'])
+    if config['WARMUP_CONNECTIONS'] > 0:
+        state.run_step('connections', prewarm_connections, session, API_ENDPOINT,
+                       count=config['WARMUP_CONNECTIONS'])
+    if config.get('CACHE_SNAPSHOT'):
+        state.run_step('cache', preload_response_cache, config['CACHE_SNAPSHOT'])
+    for step, error in state.errors.items():
+        flask_app.logger.warning("Шаг прогрева %s завершился ошибкой: %s", step, error)
+    state.mark_ready()
+
+
+def _import_mode_modules(config):
+    """Импортирует модули включенных режимов заранее, чтобы первый запрос за это не платил."""
+    if config.get('INCREMENTAL_TRANSLATION'):
+        import incremental  # noqa: F401
+    if config.get('PIPELINED_JUDGING'):
+        import pipeline  # noqa: F401
+
+
+def _get_translation_memory():
+    """Возвращает память переводов инкрементального режима, создавая ее при первом вызове."""
+    global _translation_memory
+    with _translation_memory_lock:
+        if _translation_memory is None:
+            from incremental import TranslationMemory
+            _translation_memory = TranslationMemory(int(os.getenv('INCREMENTAL_MEMORY_SIZE', '1000')))
+        return _translation_memory
+
+
+def _translate_chunk(chunk, language, tenant):
+    """Переводит чанк, сохраняя пробелы вокруг исходника для склейки."""
+    source = chunk.source
+    text = source.strip()
+    if not text:
+        return source
+    prompt = get_prompt('translation').render(language=language, text=text)
+    if prompt.truncated:
+        # Обрезанный перевод выглядел бы полным, поэтому такой чанк не переводим вовсе
+        return "Ошибка: фрагмент текста слишком длинный для перевода, разбейте его на части."
+    result = call_prompt(prompt, tenant)
+    if is_error_response(result):
+        return result
+    leading = source[:len(source) - len(source.lstrip())]
+    trailing = source[len(source.rstrip()):]
+    return leading + result.strip() + trailing
+
+
+def translate_text(original_text, language, tenant=DEFAULT_TENANT, workers=4):
+    """
+    Переводит текст целиком.
+
+    Текст, который не помещается в бюджет промпта перевода, не обрезается, а
+    делится на части по границам предложений (а длинные предложения — по
+    пробелам). Части не зависят друг от друга, поэтому переводятся параллельно
+    и склеиваются в исходном порядке.
+
+    Параметры:
+    - original_text (str): Исходный текст
+    - language (str): Язык перевода
+    - tenant (str): Клиент, от имени которого идут вызовы
+    - workers (int): Сколько частей может переводиться одновременно
+
+    Возвращает:
+    - str: Перевод или сообщение об ошибке
+    """
+    template = get_prompt('translation')
+    budget = template.field_budget(language=language)
+    if estimate_tokens(original_text) <= budget:
+        return call_prompt(template.render(language=language, text=original_text), tenant)
+
+    from concurrent.futures import ThreadPoolExecutor
+    from incremental import chunk_segments, split_segments
+
+    chunks = chunk_segments(split_segments(original_text), budget)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+        parts = list(executor.map(lambda chunk: _translate_chunk(chunk, language, tenant), chunks))
+    for part in parts:
+        if is_error_response(part):
+            return part
+    return ''.join(parts)
+
+
+def _segment_judge(tenant, shortened):
+    """
+    Возвращает функцию оценки фрагмента для pipeline.run_pipeline.
+
+    Источники фрагментов, чей промпт оценки пришлось сократить, добавляются в shortened.
+    """
+    def judge(source, translation):
+        prompt = get_prompt('segment_evaluation').render(original=source.strip(),
+                                                         translated=translation.strip())
+        if prompt.truncated:
+            shortened.append(source)
+        return call_prompt(prompt, tenant)
+    return judge
+
+
+def _summarize_verdicts(verdicts):
+    """
+    Формирует итоговую оценку всего текста по оценкам его фрагментов.
+
+    Если фрагмент один, возвращается ответ оценщика целиком (аргументация или
+    текст ошибки upstream): сводить нечего, а список фрагментов не выводится.
+    """
+    from pipeline import aggregate_scores
+
+    if len(verdicts) == 1:
+        return verdicts[0].evaluation
+    score = aggregate_scores(verdicts)
+    if score is None:
+        return "Не удалось получить оценку фрагментов перевода."
+    scored = sum(1 for verdict in verdicts if verdict.score is not None)
+    return (f"Итоговая оценка: {score:g}/10 "
+            f"(среднее по {scored} из {len(verdicts)} фрагментов, взвешенное по длине).")
+
+
+def translate_incremental(result_id, original_text, language, chunk_tokens, workers=4,
+                          tenant=DEFAULT_TENANT):
+    """
+    Инкрементальный перевод и оценка текста.
+
+    Текст переводится по чанкам, и каждый чанк оценивается отдельно (как в
+    конвейерном режиме); итоговая оценка сводится из оценок всех чанков.
+    Если для result_id есть предыдущая версия на том же языке, в модель уходят
+    только измененные чанки: их перевод вклеивается в прежний перевод, их оценки
+    заменяют прежние, а оценки неизмененных чанков переиспользуются. Поэтому
+    итог всегда относится ко всему тексту, а не только к правке.
+
+    Параметры:
+    - result_id (str): Идентификатор предыдущего результата (или пустая строка)
+    - original_text (str): Новая версия исходного текста
+    - language (str): Язык перевода
+    - chunk_tokens (int): Бюджет токенов на чанк
+    - workers (int): Сколько оценок может выполняться одновременно
+    - tenant (str): Клиент, от имени которого идут вызовы
+
+    Возвращает:
+    - tuple: (result_id, перевод, итоговая оценка, список pipeline.SegmentVerdict,
+      статистика {'changed': ..., 'total': ...}, оценивался ли хотя бы один фрагмент
+      по сокращенному тексту)
+    """
+    from incremental import (
+        TranslationMemory, TranslationRecord, chunk_segments, plan_update, split_long_segments,
+        split_segments,
+    )
+    from pipeline import run_pipeline
+
+    memory = _get_translation_memory()
+    record = memory.get(result_id)
+    # Длинные сегменты дробятся так же, как в сохраненных чанках, чтобы дифф их сопоставил
+    segments = split_long_segments(split_segments(original_text), chunk_tokens)
+    if record is not None and record.language == language:
+        chunks = plan_update(record.chunks, segments, chunk_tokens)
+    else:
+        result_id = TranslationMemory.new_id()
+        chunks = chunk_segments(segments, chunk_tokens)
+
+    changed = [chunk for chunk in chunks if chunk.translation is None]
+    # Заново оцениваются измененные чанки и чанки, оценка которых в прошлый раз не удалась
+    pending = [chunk for chunk in chunks if chunk.translation is None or chunk.verdict is None
+               or is_error_response(chunk.verdict.evaluation)]
+    stats = {'changed': len(changed), 'total': len(chunks)}
+
+    def translate(chunk):
+        if chunk.translation is not None:
+            return chunk.translation
+        return _translate_chunk(chunk, language, tenant)
+
+    shortened = []
+    verdicts, failed = run_pipeline(pending, translate, _segment_judge(tenant, shortened),
+                                    is_error_response, max_workers=workers)
+    if failed is not None:
+        # Частичный результат не запоминаем: следующая отправка переведет заново
+        return result_id, failed, "", [], stats, False
+    for chunk, verdict in zip(pending, verdicts):
+        chunk.verdict = verdict
+
+    memory.put(result_id, TranslationRecord(language, chunks))
+    translated_text = ''.join(chunk.translation for chunk in chunks)
+    verdicts = [chunk.verdict for chunk in chunks]
+    return result_id, translated_text, _summarize_verdicts(verdicts), verdicts, stats, bool(shortened)
+
+
+def translate_pipelined(original_text, language, chunk_tokens, workers, tenant=DEFAULT_TENANT):
+    """
+    Конвейерный перевод и оценка длинного текста.
+
+    Текст переводится по чанкам, и каждый готовый чанк сразу уходит оценщику,
+    пока следующие еще переводятся. Оценки фрагментов сводятся в итоговую
+    (среднее, взвешенное по длине фрагментов).
+
+    Параметры:
+    - original_text (str): Исходный текст
+    - language (str): Язык перевода
+    - chunk_tokens (int): Бюджет токенов на чанк
+    - workers (int): Сколько оценок может выполняться одновременно
+    - tenant (str): Клиент, от имени которого идут вызовы
+
+    Возвращает:
+    - tuple: (перевод, итоговая оценка, список pipeline.SegmentVerdict,
+      оценивался ли хотя бы один фрагмент по сокращенному тексту)
+    """
+    from incremental import chunk_segments, split_segments
+    from pipeline import run_pipeline
+
+    chunks = chunk_segments(split_segments(original_text), chunk_tokens)
+    shortened = []
+    verdicts, failed = run_pipeline(chunks, lambda chunk: _translate_chunk(chunk, language, tenant),
+                                    _segment_judge(tenant, shortened), is_error_response,
+                                    max_workers=workers)
+    if failed is not None:
+        return failed, "", [], False
+
+    translated_text = ''.join(verdict.translation for verdict in verdicts)
+    return translated_text, _summarize_verdicts(verdicts), verdicts, bool(shortened)
+
+
+def create_app(config=None):
+    """
+    Фабрика Flask-приложения.
+
+    Рекомендуемый запуск для воркеров: `gunicorn 'app:create_app()'`.
+    По умолчанию выполняет прогрев (см. warm_up); настраивается через config
+    или переменные окружения:
+    - WARMUP: выполнять прогрев (по умолчанию "1")
+    - WARMUP_BACKGROUND: прогревать в фоновом потоке, пока /ready отвечает 503 (по умолчанию "0")
+    - WARMUP_CONNECTIONS: сколько соединений с upstream открыть заранее (по умолчанию "2", 0 — не открывать)
+    - HTTP_POOL_SIZE: размер пула соединений (по умолчанию "10")
+    - CACHE_SNAPSHOT: путь к снимку кэша ответов; загружается при прогреве и
+      перезаписывается содержимым кэша при остановке процесса (нужен RESPONSE_CACHE_SIZE > 0)
+    - INCREMENTAL_TRANSLATION: переводить заново только измененные сегменты (по умолчанию "0")
+    - INCREMENTAL_CHUNK_TOKENS: бюджет токенов на чанк в инкрементальном режиме (по умолчанию "300")
+    - PIPELINED_JUDGING: оценивать фрагменты параллельно с переводом следующих (по умолчанию "0")
+    - PIPELINE_CHUNK_TOKENS: бюджет токенов на фрагмент в конвейерном режиме (по умолчанию "300")
+    - PIPELINE_JUDGE_WORKERS: сколько фрагментов оценивается одновременно (по умолчанию "4")
+    - TRANSLATION_WORKERS: сколько частей длинного текста переводится одновременно (по умолчанию "4")
+    - MAX_INPUT_TOKENS: максимальный размер текста в токенах, больше — ответ 413 (по умолчанию "160000", 0 — без лимита)
+    - USAGE_FLUSH_INTERVAL: период сброса статистики использования, секунд (по умолчанию "60", 0 — не сбрасывать)
+
+    Ключи upstream и лимиты клиентов читаются один раз при импорте (см. tenants.UpstreamConfig.from_env).
+
+    Параметры:
+    - config (dict): Переопределения конфигурации
+
+    Возвращает:
+    - Flask: Настроенное приложение
+    """
+    flask_app = Flask(__name__, template_folder='templates')  # Указываем папку с шаблонами
+    flask_app.config.update(
+        WARMUP=os.getenv('WARMUP', '1') == '1',
+        WARMUP_BACKGROUND=os.getenv('WARMUP_BACKGROUND', '0') == '1',
+        WARMUP_CONNECTIONS=int(os.getenv('WARMUP_CONNECTIONS', '2')),
+        HTTP_POOL_SIZE=int(os.getenv('HTTP_POOL_SIZE', '10')),
+        CACHE_SNAPSHOT=os.getenv('CACHE_SNAPSHOT'),
+        INCREMENTAL_TRANSLATION=os.getenv('INCREMENTAL_TRANSLATION', '0') == '1',
+        INCREMENTAL_CHUNK_TOKENS=int(os.getenv('INCREMENTAL_CHUNK_TOKENS', '300')),
+        PIPELINED_JUDGING=os.getenv('PIPELINED_JUDGING', '0') == '1',
+        PIPELINE_CHUNK_TOKENS=int(os.getenv('PIPELINE_CHUNK_TOKENS', '300')),
+        PIPELINE_JUDGE_WORKERS=int(os.getenv('PIPELINE_JUDGE_WORKERS', '4')),
+        TRANSLATION_WORKERS=int(os.getenv('TRANSLATION_WORKERS', '4')),
+        MAX_INPUT_TOKENS=int(os.getenv('MAX_INPUT_TOKENS', '160000')),
+        USAGE_FLUSH_INTERVAL=float(os.getenv('USAGE_FLUSH_INTERVAL', '60')),
+    )
+    if config:
+        flask_app.config.update(config)
+    flask_app.register_blueprint(bp)
+    _usage.start_flusher(flask_app.config['USAGE_FLUSH_INTERVAL'])
+
+    # Снимок кэша сохраняется при остановке; при выключенном кэше шаг прогрева 'cache'
+    # завершится ошибкой, которая попадет в журнал и в /ready
+    snapshot = flask_app.config['CACHE_SNAPSHOT']
+    if snapshot and RESPONSE_CACHE_SIZE > 0 and snapshot not in _snapshot_exit_paths:
+        _snapshot_exit_paths.add(snapshot)
+        atexit.register(_save_response_cache_on_exit, snapshot)
+
+    state = WarmupState()
+    flask_app.extensions['warmup'] = state
+    if not flask_app.config['WARMUP']:
+        state.mark_ready()
+    elif flask_app.config['WARMUP_BACKGROUND']:
+        threading.Thread(target=warm_up, args=(flask_app, state), name='warmup', daemon=True).start()
+    else:
+        warm_up(flask_app, state)
+    return flask_app
+
+
+# Роут для проверки готовности воркера (для балансировщика/оркестратора)
+@bp.route('/ready')
+def ready():
+    """
+    Эндпоинт готовности: 200, когда прогрев завершен, иначе 503.
+    """
+    state = current_app.extensions['warmup']
+    body = {
+        'status': 'ready' if state.ready else 'warming',
+        'steps': state.steps,
+        'errors': state.errors,
+    }
+    return jsonify(body), (200 if state.ready else 503)
+
+
 # Роут для главной страницы (GET и POST)
-@app.route('/', methods=['GET', 'POST'])
+@bp.route('/', methods=['GET', 'POST'])
 def index():
     """
     Основной роут приложения.
@@ -68,26 +567,97 @@ def index():
         original_text = request.form.get('text', '')  # Исходный текст
         language = request.form.get('language', 'Английский')  # Выбранный язык
         
-        # Шаг 1: Перевод текста
-        # Формирование промпта для перевода
-        translation_prompt = f"Переведи следующий текст на {language}: {original_text}"
-        translated_text = call_llm("Qwen/Qwen3-VL-30B-A3B-Instruct", translation_prompt)
+        # Определение клиента по секретному токену и проверка его лимита запросов
+        tenant = UPSTREAM_CONFIG.resolve_tenant(request.headers.get(UPSTREAM_CONFIG.token_header))
+        try:
+            _tenant_limiter.check_rate(tenant)
+        except RateLimitExceeded:
+            return render_template('index.html',
+                                   original=original_text,
+                                   translated="",
+                                   evaluation="Ошибка: превышен лимит запросов, попробуйте позже.",
+                                   language=language), 429
+        
+        # Слишком большой текст отклоняем сразу: иначе он стоил бы десятков вызовов upstream
+        max_input_tokens = current_app.config['MAX_INPUT_TOKENS']
+        if max_input_tokens > 0 and estimate_tokens(original_text) > max_input_tokens:
+            return render_template('index.html',
+                                   original=original_text,
+                                   translated="",
+                                   evaluation=(f"Ошибка: текст слишком длинный "
+                                               f"(больше {max_input_tokens} токенов), сократите его."),
+                                   language=language), 413
+        
+        # Инкрементальный режим: переводим и оцениваем только измененные сегменты,
+        # итоговая оценка сводится по всем фрагментам текста
+        if current_app.config['INCREMENTAL_TRANSLATION']:
+            result_id, translated_text, evaluation, verdicts, stats, truncated = translate_incremental(
+                request.form.get('result_id', ''), original_text, language,
+                current_app.config['INCREMENTAL_CHUNK_TOKENS'],
+                current_app.config['PIPELINE_JUDGE_WORKERS'], tenant)
+            return render_template('index.html',
+                                   original=original_text,
+                                   translated=translated_text,
+                                   evaluation=evaluation,
+                                   language=language,
+                                   result_id=result_id,
+                                   segments=verdicts,
+                                   incremental=stats,
+                                   truncated=truncated)
+        
+        # Конвейерный режим: оценка готовых фрагментов идет параллельно с переводом следующих
+        if current_app.config['PIPELINED_JUDGING']:
+            translated_text, evaluation, verdicts, truncated = translate_pipelined(
+                original_text, language, current_app.config['PIPELINE_CHUNK_TOKENS'],
+                current_app.config['PIPELINE_JUDGE_WORKERS'], tenant)
+            return render_template('index.html',
+                                   original=original_text,
+                                   translated=translated_text,
+                                   evaluation=evaluation,
+                                   language=language,
+                                   segments=verdicts,
+                                   truncated=truncated)
+        
+        # Шаг 1: Перевод текста (длинный текст переводится по частям, без потери середины)
+        translated_text = translate_text(original_text, language, tenant,
+                                         current_app.config['TRANSLATION_WORKERS'])
         
         # Шаг 2: Оценка перевода
-        # Формирование промпта для оценки
-        evaluation_prompt = f"Оцени качество перевода от 1 до 10 и аргументируй. Оригинал: '{original_text}'. Перевод: '{translated_text}'."
-        evaluation = call_llm("claude-sonnet-4-5-20250929", evaluation_prompt)
+        # Формирование промпта для оценки (с обрезкой под бюджет токенов модели-оценщика)
+        evaluation_prompt = get_prompt('evaluation').render(original=original_text, translated=translated_text)
+        evaluation = call_prompt(evaluation_prompt, tenant)
         
         # Передача данных в шаблон для отображения
         return render_template('index.html', 
                                original=original_text, 
                                translated=translated_text, 
                                evaluation=evaluation, 
-                               language=language)
+                               language=language,
+                               truncated=evaluation_prompt.truncated)
     
     # Для GET запроса просто рендерим форму
     return render_template('index.html')
 
+def __getattr__(name):
+    """
+    Ленивые атрибуты модуля (PEP 562).
+
+    - app: экземпляр без прогрева для `from app import app` (тесты, инструменты).
+      Создается при первом обращении, поэтому `gunicorn 'app:create_app()'`
+      строит ровно одно приложение на воркер.
+    - requests: HTTP-клиент (для совместимости с `patch('app.requests.post')`).
+    """
+    global app
+    if name == 'app':
+        with _default_app_lock:
+            if 'app' not in globals():
+                app = create_app({'WARMUP': False})
+        return globals()['app']
+    if name == 'requests':
+        import requests
+        return requests
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 # Запуск приложения в режиме отладки
 if __name__ == '__main__':
-    app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
+    create_app().run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,218 @@
+# Инкрементальный перевод: сегментация текста, дифф по сегментам и память переводов
+import re  # Для разбиения текста на предложения
+import threading  # Для потокобезопасного доступа к памяти переводов
+import uuid  # Для идентификаторов результатов
+from collections import OrderedDict  # Для LRU-хранилища
+from difflib import SequenceMatcher  # Для диффа списков сегментов
+
+from prompts import estimate_tokens  # Для группировки сегментов в чанки по бюджету
+
+# Сегмент — предложение вместе с завершающими пробелами, либо строка до перевода строки.
+# Пробелы остаются внутри сегмента, поэтому ''.join(segments) == text.
+_SEGMENT_RE = re.compile(r'.*?(?:[.!?…]+["\'»)\]]*(?:\s+|$)|\n+|$)', re.S)
+
+
+def split_segments(text):
+    """
+    Разбивает текст на сегменты (предложения) без потери символов.
+
+    Параметры:
+    - text (str): Исходный текст
+
+    Возвращает:
+    - list: Список сегментов, склейка которых равна исходному тексту
+    """
+    return [segment for segment in _SEGMENT_RE.findall(text) if segment]
+
+
+class Chunk:
+    """
+    Чанк — группа соседних сегментов, переведенная одним вызовом модели.
+
+    Атрибуты:
+    - segments (tuple): Исходные сегменты чанка
+    - translation (str): Перевод чанка (None, пока не переведен)
+    - verdict (pipeline.SegmentVerdict): Оценка перевода чанка (None, пока не оценен)
+    """
+
+    __slots__ = ('segments', 'translation', 'verdict')
+
+    def __init__(self, segments, translation=None, verdict=None):
+        self.segments = tuple(segments)
+        self.translation = translation
+        self.verdict = verdict
+
+    @property
+    def source(self):
+        return ''.join(self.segments)
+
+
+def chunk_segments(segments, max_tokens):
+    """
+    Группирует сегменты в чанки не больше max_tokens.
+
+    Сегмент длиннее лимита (например, абзац без знаков препинания) предварительно
+    дробится split_long_segments, поэтому ни один чанк не выходит за бюджет.
+
+    Параметры:
+    - segments (list): Сегменты текста
+    - max_tokens (int): Бюджет токенов на чанк
+
+    Возвращает:
+    - list: Список непереведенных Chunk
+    """
+    chunks = []
+    current, current_tokens = [], 0
+    for segment in split_long_segments(segments, max_tokens):
+        tokens = estimate_tokens(segment)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(Chunk(current))
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += tokens
+    if current:
+        chunks.append(Chunk(current))
+    return chunks
+
+
+def split_long_segments(segments, max_tokens):
+    """
+    Дробит сегменты длиннее max_tokens на части, не теряя символов.
+
+    Сегмент режется по последнему пробелу или переводу строки, укладывающемуся
+    в бюджет; если пробелов нет — по бюджету в символах.
+
+    Параметры:
+    - segments (list): Сегменты текста
+    - max_tokens (int): Бюджет токенов на одну часть
+
+    Возвращает:
+    - list: Сегменты, каждый из которых укладывается в бюджет
+    """
+    max_tokens = max(max_tokens, 1)
+    result = []
+    for segment in segments:
+        while estimate_tokens(segment) > max_tokens:
+            # Длина префикса в символах по плотности сегмента, с поправкой на неравномерность
+            limit = max(len(segment) * max_tokens // estimate_tokens(segment), 1)
+            while limit > 1 and estimate_tokens(segment[:limit]) > max_tokens:
+                limit = limit * 9 // 10
+            cut = max(segment.rfind(' ', 0, limit), segment.rfind('\n', 0, limit)) + 1
+            if cut <= 0:
+                cut = limit
+            result.append(segment[:cut])
+            segment = segment[cut:]
+        if segment:
+            result.append(segment)
+    return result
+
+
+def plan_update(chunks, new_segments, max_tokens):
+    """
+    Сопоставляет новую версию текста с переведенными чанками предыдущей версии.
+
+    Чанк переиспользуется, если все его сегменты дошли до новой версии без
+    изменений и внутрь него ничего не вставлено. Новые и измененные сегменты
+    между переиспользованными чанками заново группируются в непереведенные чанки.
+
+    Длинные сегменты в чанках хранятся раздробленными (см. chunk_segments),
+    поэтому new_segments должны быть раздроблены с тем же бюджетом, иначе
+    такой сегмент никогда не совпадет с прежней версией.
+
+    Параметры:
+    - chunks (list): Переведенные чанки предыдущей версии
+    - new_segments (list): Сегменты новой версии текста (после split_long_segments)
+    - max_tokens (int): Бюджет токенов на новый чанк
+
+    Возвращает:
+    - list: Чанки новой версии; у непереведенных translation is None
+    """
+    old_segments = [segment for chunk in chunks for segment in chunk.segments]
+    matcher = SequenceMatcher(None, old_segments, new_segments, autojunk=False)
+    opcodes = matcher.get_opcodes()
+
+    # Для каждого старого сегмента: индекс в новой версии (None — изменен или удален)
+    new_index = [None] * len(old_segments)
+    # Позиции в старой версии, перед которыми что-то вставлено
+    inserted_before = set()
+    for tag, i1, i2, j1, _ in opcodes:
+        if tag == 'equal':
+            for offset in range(i2 - i1):
+                new_index[i1 + offset] = j1 + offset
+        elif tag == 'insert':
+            inserted_before.add(i1)
+
+    plan = []
+    position = 0  # Текущая позиция в новой версии
+    start = 0  # Индекс первого сегмента чанка в старой версии
+    for chunk in chunks:
+        end = start + len(chunk.segments)
+        indices = new_index[start:end]
+        unchanged = (
+            all(index is not None for index in indices)
+            and not any(start < i < end for i in inserted_before)
+        )
+        if unchanged:
+            # Все, что в новой версии стоит до этого чанка, — новый текст
+            plan.extend(chunk_segments(new_segments[position:indices[0]], max_tokens))
+            plan.append(chunk)
+            position = indices[-1] + 1
+        start = end
+    plan.extend(chunk_segments(new_segments[position:], max_tokens))
+    return plan
+
+
+class TranslationRecord:
+    """
+    Запись памяти переводов для одного результата.
+
+    Атрибуты:
+    - language (str): Язык перевода
+    - chunks (list): Переведенные и оцененные чанки
+    """
+
+    __slots__ = ('language', 'chunks')
+
+    def __init__(self, language, chunks):
+        self.language = language
+        self.chunks = chunks
+
+
+class TranslationMemory:
+    """
+    LRU-хранилище переведенных версий текста по идентификатору результата.
+
+    Параметры:
+    - max_entries (int): Максимальное количество хранимых результатов
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id():
+        """Создает новый идентификатор результата."""
+        return uuid.uuid4().hex
+
+    def get(self, result_id):
+        """Возвращает запись по идентификатору или None."""
+        if not result_id:
+            return None
+        with self._lock:
+            record = self._records.get(result_id)
+            if record is not None:
+                self._records.move_to_end(result_id)
+            return record
+
+    def put(self, result_id, record):
+        """Сохраняет запись, вытесняя самые старые при переполнении."""
+        with self._lock:
+            self._records[result_id] = record
+            self._records.move_to_end(result_id)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+
+    def __len__(self):
+        return len(self._records)
@@ -0,0 +1,104 @@
+# Конвейер "перевод -> оценка": оценка готовых фрагментов параллельно с переводом следующих
+import re  # Для извлечения оценки из ответа модели
+from concurrent.futures import ThreadPoolExecutor  # Для параллельной оценки фрагментов
+
+from prompts import estimate_tokens  # Вес фрагмента при агрегации оценок
+
+# Оценка вида "8/10", "7.5 / 10" или "Оценка: 8"
+_SCORE_RE = re.compile(r'(\d+(?:[.,]\d+)?)\s*/\s*10\b|[Оо]ценка\s*[:\-—]?\s*(\d+(?:[.,]\d+)?)')
+
+
+def parse_score(text):
+    """
+    Извлекает числовую оценку от 1 до 10 из ответа модели-оценщика.
+
+    Параметры:
+    - text (str): Ответ оценщика
+
+    Возвращает:
+    - float: Оценка или None, если распознать ее не удалось
+    """
+    for match in _SCORE_RE.finditer(text or ''):
+        value = float((match.group(1) or match.group(2)).replace(',', '.'))
+        if 0 <= value <= 10:
+            return value
+    return None
+
+
+class SegmentVerdict:
+    """
+    Оценка одного фрагмента перевода.
+
+    Атрибуты:
+    - source (str): Исходный фрагмент
+    - translation (str): Перевод фрагмента
+    - evaluation (str): Ответ оценщика
+    - score (float): Распознанная оценка или None
+    - weight (int): Вес фрагмента при агрегации (оценка токенов исходника)
+    """
+
+    __slots__ = ('source', 'translation', 'evaluation', 'score', 'weight')
+
+    def __init__(self, source, translation, evaluation):
+        self.source = source
+        self.translation = translation
+        self.evaluation = evaluation
+        self.score = parse_score(evaluation)
+        self.weight = max(estimate_tokens(source), 1)
+
+
+def aggregate_scores(verdicts):
+    """
+    Сводит оценки фрагментов в итоговую: среднее, взвешенное по длине фрагментов.
+
+    Фрагменты без распознанной оценки в среднем не участвуют.
+
+    Параметры:
+    - verdicts (list): Список SegmentVerdict
+
+    Возвращает:
+    - float: Итоговая оценка, округленная до 0.1, или None
+    """
+    scored = [verdict for verdict in verdicts if verdict.score is not None]
+    if not scored:
+        return None
+    total_weight = sum(verdict.weight for verdict in scored)
+    return round(sum(verdict.score * verdict.weight for verdict in scored) / total_weight, 1)
+
+
+def run_pipeline(chunks, translate, judge, is_error, max_workers=4):
+    """
+    Переводит чанки по очереди и оценивает каждый сразу после его перевода.
+
+    Перевод идет последовательно, а оценка готовых чанков — в пуле потоков,
+    поэтому пока переводится чанк N, уже оцениваются чанки до N. Общая
+    задержка стремится к max(перевод, оценка) вместо их суммы.
+
+    Параметры:
+    - chunks (list): Чанки текста (incremental.Chunk)
+    - translate (callable): chunk -> перевод или сообщение об ошибке
+    - judge (callable): (source, translation) -> ответ оценщика
+    - is_error (callable): Проверка, является ли ответ сообщением об ошибке
+    - max_workers (int): Сколько оценок может выполняться одновременно
+
+    Возвращает:
+    - tuple: (список SegmentVerdict, сообщение об ошибке перевода или None)
+    """
+    pending = []
+    failed = None
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for chunk in chunks:
+            translation = translate(chunk)
+            if is_error(translation):
+                failed = translation
+                break
+            chunk.translation = translation
+            pending.append((chunk, executor.submit(judge, chunk.source, translation)))
+        if failed is not None:
+            # Перевод оборвался: оценки еще не начатых фрагментов больше не нужны
+            for _, future in pending:
+                future.cancel()
+            return [], failed
+        verdicts = [SegmentVerdict(chunk.source, chunk.translation, future.result())
+                    for chunk, future in pending]
+    return verdicts, failed
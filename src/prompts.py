@@ -0,0 +1,261 @@
+# Подсистема промптов: именованные версионированные шаблоны, оценка токенов и контроль бюджета
+import hashlib  # Для построения ключей кэша
+import threading  # Для потокобезопасного обновления метрик
+from collections import defaultdict  # Для счетчиков метрик по тегам
+from string import Formatter  # Для разбора шаблона на литералы и поля один раз
+
+# Имена моделей, используемых приложением
+WORKER_MODEL = "Qwen/Qwen3-VL-30B-A3B-Instruct"  # Модель-переводчик
+JUDGE_MODEL = "claude-sonnet-4-5-20250929"  # Модель-оценщик (LLM-as-a-Judge)
+
+# Маркер, которым заменяется вырезанная середина слишком длинного текста
+TRUNCATION_MARKER = " [...] "
+
+# Метрики по тегам промптов: сколько раз отрендерен, сколько токенов, сколько обрезаний
+PROMPT_METRICS = defaultdict(lambda: defaultdict(int))
+_metrics_lock = threading.Lock()
+
+
+def record_metric(tag, name, value=1):
+    """
+    Увеличивает счетчик метрики для тега промпта.
+
+    Параметры:
+    - tag (str): Тег версии промпта, например "translation@v1"
+    - name (str): Имя счетчика, например "cache_hits"
+    - value (int): На сколько увеличить счетчик
+    """
+    with _metrics_lock:
+        PROMPT_METRICS[tag][name] += value
+
+
+def estimate_tokens(text):
+    """
+    Быстрая локальная оценка количества токенов в тексте.
+
+    Используется эвристика "около 4 байт UTF-8 на токен": для латиницы это
+    примерно 4 символа на токен, для кириллицы (2 байта на символ) — около 2.
+    Токенизатор модели не вызывается, поэтому оценка работает за O(n) без сети.
+
+    Параметры:
+    - text (str): Текст для оценки
+
+    Возвращает:
+    - int: Примерное количество токенов
+    """
+    if not text:
+        return 0
+    return (len(text.encode('utf-8')) + 3) // 4
+
+
+def truncate_to_tokens(text, max_tokens):
+    """
+    Обрезает текст до заданного бюджета токенов.
+
+    Сохраняются начало (2/3 бюджета) и конец (1/3 бюджета) текста,
+    середина заменяется маркером TRUNCATION_MARKER — так у модели остается
+    контекст и начала, и завершения документа.
+
+    Параметры:
+    - text (str): Исходный текст
+    - max_tokens (int): Максимальное количество токенов
+
+    Возвращает:
+    - str: Текст, укладывающийся в бюджет (или исходный, если он и так помещается)
+    """
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    # Бюджет считается в байтах UTF-8, как и estimate_tokens: начало и конец режутся
+    # каждый по своей плотности, поэтому смешанные алфавиты не выводят за бюджет.
+    # Неполный многобайтовый символ на границе среза отбрасывается.
+    encoded = text.encode('utf-8')
+    budget_bytes = max_tokens * 4 - len(TRUNCATION_MARKER.encode('utf-8'))
+    if budget_bytes <= 0:
+        return encoded[:max_tokens * 4].decode('utf-8', 'ignore')
+    head_bytes = budget_bytes * 2 // 3
+    tail_bytes = budget_bytes - head_bytes
+    head = encoded[:head_bytes].decode('utf-8', 'ignore')
+    tail = encoded[-tail_bytes:].decode('utf-8', 'ignore') if tail_bytes else ""
+    return head + TRUNCATION_MARKER + tail
+
+
+class RenderedPrompt:
+    """
+    Результат рендеринга шаблона: готовый текст промпта и его метаданные.
+
+    Атрибуты:
+    - text (str): Текст промпта для отправки в модель
+    - model (str): Модель, для которой предназначен промпт
+    - tag (str): Тег версии промпта вида "translation@v1"
+    - tokens (int): Оценка количества токенов в промпте
+    - truncated (bool): Были ли входные данные обрезаны под бюджет
+    """
+
+    __slots__ = ('text', 'model', 'tag', 'tokens', 'truncated')
+
+    def __init__(self, text, model, tag, tokens, truncated):
+        self.text = text
+        self.model = model
+        self.tag = tag
+        self.tokens = tokens
+        self.truncated = truncated
+
+    @property
+    def cache_key(self):
+        """Ключ кэша ответа: включает тег версии, чтобы смена шаблона инвалидировала кэш."""
+        digest = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+        return f"{self.tag}:{self.model}:{digest}"
+
+
+class PromptTemplate:
+    """
+    Именованный версионированный шаблон промпта для конкретной модели.
+
+    Шаблон задается в синтаксисе str.format и разбирается на литералы и поля
+    один раз при создании, поэтому рендеринг — это только склейка строк.
+
+    Параметры:
+    - name (str): Имя шаблона, например "translation"
+    - version (str): Версия шаблона, например "v1"
+    - model (str): Имя модели, для которой предназначен шаблон
+    - template (str): Текст шаблона с полями вида {field}
+    - max_tokens (int): Бюджет токенов на весь промпт
+    - truncatable (tuple): Поля, которые можно обрезать при превышении бюджета
+    """
+
+    def __init__(self, name, version, model, template, max_tokens, truncatable=()):
+        self.name = name
+        self.version = version
+        self.model = model
+        self.template = template
+        self.max_tokens = max_tokens
+        self.truncatable = tuple(truncatable)
+
+        # Компиляция: список пар (литерал, имя поля или None)
+        self._parts = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+        self.fields = tuple(field for _, field in self._parts if field)
+        # Токены литеральной части шаблона считаются один раз
+        self._overhead_tokens = estimate_tokens(''.join(literal for literal, _ in self._parts))
+
+        unknown = set(self.truncatable) - set(self.fields)
+        if unknown:
+            raise ValueError(f"Неизвестные поля для обрезки в шаблоне {self.tag}: {sorted(unknown)}")
+
+    @property
+    def tag(self):
+        """Тег версии шаблона для ключей кэша и метрик."""
+        return f"{self.name}@{self.version}"
+
+    def field_budget(self, **values):
+        """
+        Возвращает бюджет токенов, который остается обрезаемым полям.
+
+        Параметры:
+        - **values: Значения необрезаемых полей шаблона
+
+        Возвращает:
+        - int: Сколько токенов в сумме помещается в обрезаемые поля без обрезки
+        """
+        fixed_tokens = sum(estimate_tokens(str(values[field])) for field in self.fields
+                           if field not in self.truncatable)
+        return self.max_tokens - self._overhead_tokens - fixed_tokens
+
+    def _fit_fields(self, values):
+        """Распределяет оставшийся бюджет между обрезаемыми полями и обрезает их."""
+        budget = self.field_budget(**values)
+        sizes = {field: estimate_tokens(values[field]) for field in self.truncatable}
+        if sum(sizes.values()) <= budget:
+            return values, False
+
+        # Справедливое распределение: короткие поля сохраняются целиком,
+        # остаток делится поровну между длинными
+        allocation = {}
+        remaining = max(budget, 0)
+        pending = sorted(sizes, key=sizes.get)
+        while pending:
+            share = remaining // len(pending)
+            field = pending[0]
+            if sizes[field] <= share:
+                allocation[field] = sizes[field]
+                remaining -= sizes[field]
+                pending.pop(0)
+            else:
+                for field in pending:
+                    allocation[field] = share
+                break
+
+        fitted = dict(values)
+        for field, limit in allocation.items():
+            fitted[field] = truncate_to_tokens(values[field], limit)
+        return fitted, True
+
+    def render(self, **values):
+        """
+        Рендерит шаблон с подстановкой значений и контролем бюджета токенов.
+
+        Параметры:
+        - **values: Значения полей шаблона
+
+        Возвращает:
+        - RenderedPrompt: Готовый промпт с метаданными
+        """
+        values = {field: str(values[field]) for field in self.fields}
+        fitted, truncated = self._fit_fields(values)
+        text = ''.join(literal + (fitted[field] if field else '') for literal, field in self._parts)
+        tokens = estimate_tokens(text)
+
+        record_metric(self.tag, 'renders')
+        record_metric(self.tag, 'tokens', tokens)
+        if truncated:
+            record_metric(self.tag, 'truncated')
+
+        return RenderedPrompt(text, self.model, self.tag, tokens, truncated)
+
+
+# Реестр шаблонов: компилируется один раз при импорте модуля
+PROMPTS = {
+    'translation': PromptTemplate(
+        name='translation',
+        version='v1',
+        model=WORKER_MODEL,
+        template="Переведи следующий текст на {language}: {text}",
+        max_tokens=8000,
+        truncatable=('text',),
+    ),
+    'evaluation': PromptTemplate(
+        name='evaluation',
+        version='v1',
+        model=JUDGE_MODEL,
+        template="Оцени качество перевода от 1 до 10 и аргументируй. Оригинал: '{original}'. Перевод: '{translated}'.",
+        max_tokens=12000,
+        truncatable=('original', 'translated'),
+    ),
+    'segment_evaluation': PromptTemplate(
+        name='segment_evaluation',
+        version='v1',
+        model=JUDGE_MODEL,
+        template="Оцени качество перевода фрагмента текста от 1 до 10. Начни ответ с \"Оценка: N/10\", затем кратко аргументируй. Оригинал: '{original}'. Перевод: '{translated}'.",
+        max_tokens=4000,
+        truncatable=('original', 'translated'),
+    ),
+}
+
+
+def get_prompt(name):
+    """
+    Возвращает скомпилированный шаблон по имени.
+
+    Параметры:
+    - name (str): Имя шаблона
+
+    Возвращает:
+    - PromptTemplate: Шаблон из реестра PROMPTS
+    """
+    try:
+        return PROMPTS[name]
+    except KeyError:
+        raise KeyError(f"Шаблон промпта не найден: {name}") from None
@@ -0,0 +1,328 @@
+# Мультиарендность: конфигурация ключей upstream, учет использования и справедливые лимиты
+import atexit  # Для последнего сброса статистики при остановке процесса
+import hashlib  # Для хранения секретных токенов клиентов в виде хэшей
+import json  # Для записи сброшенной статистики
+import logging  # Для журнала сброса статистики
+import os  # Для чтения конфигурации из окружения
+import threading  # Для блокировок, условий и фонового сброса
+import time  # Для токен-бакета и замера задержки
+import zlib  # Для стабильного хэша клиента при выборе ключа из пула
+from collections import defaultdict  # Для счетчиков по клиентам
+
+logger = logging.getLogger(__name__)
+
+# Клиент по умолчанию, если токен не передан или не распознан
+DEFAULT_TENANT = "default"
+
+# Сколько токен-бакетов хранить, прежде чем выбрасывать полностью восстановившиеся
+MAX_TRACKED_BUCKETS = 1024
+
+
+def _parse_mapping(value, name, split_last=False):
+    """
+    Разбирает строку вида "left1=right1,left2=right2" (переменная окружения name) в словарь.
+
+    Имена клиентов не содержат "=", а ключи и токены могут (например, паддинг base64),
+    поэтому запись делится по "=" со стороны имени клиента: по первому, если имя слева,
+    и по последнему (split_last=True), если имя справа.
+    """
+    mapping = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        left, sep, right = item.rpartition('=') if split_last else item.partition('=')
+        if not sep or not left.strip() or not right.strip():
+            raise ValueError(f"Некорректная запись в {name}: {item!r}")
+        mapping[left.strip()] = right.strip()
+    return mapping
+
+
+def _token_digest(token):
+    """Хэш секретного токена клиента: в памяти не хранятся сами токены."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class UpstreamConfig:
+    """
+    Конфигурация доступа к upstream, загружаемая один раз при старте.
+
+    Параметры:
+    - api_keys (list): Пул ключей upstream; клиент без явного ключа получает
+      ключ из пула по стабильному хэшу своего идентификатора
+    - tenant_keys (dict): Явные ключи для отдельных клиентов
+    - tenant_tokens (dict): Секретные токены клиентов: токен -> идентификатор клиента
+    - token_header (str): HTTP-заголовок с секретным токеном клиента
+    - rate_per_minute (float): Лимит запросов клиента в минуту (0 — без лимита)
+    - burst (int): Допустимый всплеск запросов сверх равномерного темпа
+    - max_concurrency (int): Общий лимит одновременных вызовов upstream (0 — без лимита)
+    - acquire_timeout (float): Сколько ждать свободного слота upstream, секунд
+    - request_timeout (float): Таймаут одного HTTP-запроса к upstream, секунд
+    """
+
+    def __init__(self, api_keys=(), tenant_keys=None, tenant_tokens=None, token_header='X-Tenant-Token',
+                 rate_per_minute=0, burst=10, max_concurrency=0, acquire_timeout=30.0,
+                 request_timeout=60.0):
+        self.api_keys = [key for key in api_keys if key]
+        self.tenant_keys = dict(tenant_keys or {})
+        self._tenants_by_digest = {_token_digest(token): tenant
+                                   for token, tenant in (tenant_tokens or {}).items()}
+        self.token_header = token_header
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.request_timeout = request_timeout
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """
+        Загружает конфигурацию из переменных окружения.
+
+        - API_KEYS: пул ключей через запятую (если не задан — используется API_KEY)
+        - TENANT_KEYS: явные ключи клиентов, "tenant1=key1,tenant2=key2"
+        - TENANT_TOKENS: секретные токены клиентов, "token1=tenant1,token2=tenant2"
+        - TENANT_TOKEN_HEADER: заголовок с токеном клиента (по умолчанию X-Tenant-Token)
+        - TENANT_RATE_PER_MINUTE, TENANT_BURST: лимит запросов клиента
+        - UPSTREAM_MAX_CONCURRENCY, UPSTREAM_ACQUIRE_TIMEOUT: справедливый лимит параллелизма
+        - UPSTREAM_TIMEOUT: таймаут HTTP-запроса к upstream
+        """
+        environ = os.environ if environ is None else environ
+        api_keys = [key.strip() for key in environ.get('API_KEYS', '').split(',') if key.strip()]
+        if not api_keys and environ.get('API_KEY'):
+            api_keys = [environ['API_KEY']]
+        return cls(
+            api_keys=api_keys,
+            tenant_keys=_parse_mapping(environ.get('TENANT_KEYS', ''), 'TENANT_KEYS'),
+            tenant_tokens=_parse_mapping(environ.get('TENANT_TOKENS', ''), 'TENANT_TOKENS',
+                                         split_last=True),
+            token_header=environ.get('TENANT_TOKEN_HEADER', 'X-Tenant-Token'),
+            rate_per_minute=float(environ.get('TENANT_RATE_PER_MINUTE', '0')),
+            burst=int(environ.get('TENANT_BURST', '10')),
+            max_concurrency=int(environ.get('UPSTREAM_MAX_CONCURRENCY', '0')),
+            acquire_timeout=float(environ.get('UPSTREAM_ACQUIRE_TIMEOUT', '30')),
+            request_timeout=float(environ.get('UPSTREAM_TIMEOUT', '60')),
+        )
+
+    def resolve_tenant(self, token):
+        """
+        Определяет клиента по секретному токену из заголовка запроса.
+
+        Клиент не может назвать себя сам: только токен из TENANT_TOKENS дает
+        доступ к ключу и квоте клиента. Без токена или с неизвестным токеном
+        запрос идет от клиента по умолчанию, поэтому набор клиентов (и память
+        под их лимиты и статистику) ограничен конфигурацией.
+
+        Параметры:
+        - token (str): Значение заголовка (может быть None)
+
+        Возвращает:
+        - str: Идентификатор клиента или DEFAULT_TENANT
+        """
+        if not token:
+            return DEFAULT_TENANT
+        return self._tenants_by_digest.get(_token_digest(token), DEFAULT_TENANT)
+
+    def key_for(self, tenant):
+        """
+        Возвращает ключ upstream для клиента.
+
+        Параметры:
+        - tenant (str): Идентификатор клиента
+
+        Возвращает:
+        - str: Ключ API или None, если ключей нет
+        """
+        key = self.tenant_keys.get(tenant)
+        if key:
+            return key
+        if not self.api_keys:
+            return None
+        return self.api_keys[zlib.crc32(tenant.encode('utf-8')) % len(self.api_keys)]
+
+
+class UsageStore:
+    """
+    Быстрые счетчики использования upstream по клиентам с периодическим сбросом.
+
+    Запись — это несколько сложений под одной блокировкой; сброс забирает
+    накопленные дельты целиком и пишет их в журнал (и в JSONL-файл, если задан).
+
+    Параметры:
+    - path (str): Файл для дозаписи сброшенной статистики (JSON Lines), необязателен
+    """
+
+    FIELDS = ('calls', 'errors', 'prompt_tokens', 'response_tokens', 'latency_ms')
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pending = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+        self._totals = defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+        self._flusher = None
+
+    def record(self, tenant, prompt_tokens, response_tokens, latency, error=False):
+        """
+        Учитывает один вызов upstream.
+
+        Параметры:
+        - tenant (str): Идентификатор клиента
+        - prompt_tokens (int): Оценка токенов промпта
+        - response_tokens (int): Оценка токенов ответа
+        - latency (float): Длительность вызова в секундах
+        - error (bool): Завершился ли вызов ошибкой
+        """
+        latency_ms = latency * 1000
+        with self._lock:
+            for counters in (self._pending[tenant], self._totals[tenant]):
+                counters['calls'] += 1
+                counters['errors'] += int(error)
+                counters['prompt_tokens'] += prompt_tokens
+                counters['response_tokens'] += response_tokens
+                counters['latency_ms'] += latency_ms
+
+    def totals(self, tenant=None):
+        """Возвращает накопленные итоги (по клиенту или по всем клиентам)."""
+        with self._lock:
+            if tenant is not None:
+                return dict(self._totals.get(tenant) or dict.fromkeys(self.FIELDS, 0))
+            return {name: dict(counters) for name, counters in self._totals.items()}
+
+    def flush(self):
+        """
+        Сбрасывает накопленные с прошлого сброса дельты.
+
+        Возвращает:
+        - dict: Дельты по клиентам (пустой словарь, если вызовов не было)
+        """
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: dict.fromkeys(self.FIELDS, 0))
+        if not pending:
+            return {}
+        pending = {tenant: dict(counters) for tenant, counters in pending.items()}
+        line = json.dumps({'ts': time.time(), 'usage': pending}, ensure_ascii=False)
+        logger.info("Использование upstream: %s", line)
+        if self.path:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        return pending
+
+    def start_flusher(self, interval):
+        """
+        Запускает фоновый поток, сбрасывающий статистику каждые interval секунд.
+
+        Поток фоновый и завершается вместе с процессом, поэтому последний сброс
+        регистрируется в atexit — иначе короткоживущий воркер терял бы до
+        interval секунд статистики. Повторный вызов ничего не делает.
+        """
+        if self._flusher is not None or interval <= 0:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception:  # noqa: BLE001 — сбой записи не должен остановить поток
+                    logger.exception("Не удалось сбросить статистику использования")
+
+        self._flusher = threading.Thread(target=run, name='usage-flusher', daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+
+class RateLimitExceeded(Exception):
+    """Клиент превысил лимит запросов."""
+
+
+class TenantLimiter:
+    """
+    Лимиты клиентов: токен-бакет на частоту запросов и справедливая доля параллелизма.
+
+    Справедливая доля: общий лимит одновременных вызовов upstream делится
+    поровну между клиентами, у которых сейчас есть вызовы в работе или в
+    ожидании. Один тяжелый клиент не может занять больше своей доли, пока
+    слоты нужны другим; когда он один — ему доступен весь лимит.
+
+    Параметры:
+    - config (UpstreamConfig): Конфигурация лимитов
+    """
+
+    def __init__(self, config):
+        self.rate_per_minute = config.rate_per_minute
+        self.burst = max(config.burst, 1)
+        self.max_concurrency = config.max_concurrency
+        self.acquire_timeout = config.acquire_timeout
+        self._lock = threading.Lock()
+        self._buckets = {}  # tenant -> (токены, время последнего пополнения)
+        self._condition = threading.Condition()
+        self._inflight = defaultdict(int)
+        self._waiting = defaultdict(int)
+
+    def check_rate(self, tenant):
+        """
+        Списывает один запрос из токен-бакета клиента.
+
+        Исключения:
+        - RateLimitExceeded: Если лимит запросов исчерпан
+        """
+        if self.rate_per_minute <= 0:
+            return
+        rate = self.rate_per_minute / 60.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(tenant, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * rate)
+            if tenant not in self._buckets and len(self._buckets) >= MAX_TRACKED_BUCKETS:
+                self._evict_full_buckets(now, rate)
+            if tokens < 1:
+                self._buckets[tenant] = (tokens, now)
+                raise RateLimitExceeded(tenant)
+            self._buckets[tenant] = (tokens - 1, now)
+
+    def _evict_full_buckets(self, now, rate):
+        """Выбрасывает бакеты, которые уже полностью восстановились: они равны отсутствующим."""
+        full = [tenant for tenant, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * rate >= self.burst]
+        for tenant in full:
+            del self._buckets[tenant]
+
+    def _fair_share(self):
+        active = len(set(self._inflight) | set(self._waiting))
+        return max(1, self.max_concurrency // max(active, 1))
+
+    def _can_start(self, tenant):
+        total = sum(self._inflight.values())
+        return total < self.max_concurrency and self._inflight.get(tenant, 0) < self._fair_share()
+
+    def acquire(self, tenant):
+        """
+        Занимает слот upstream для клиента с учетом его справедливой доли.
+
+        Возвращает:
+        - bool: True, если слот получен; False по таймауту ожидания
+        """
+        if self.max_concurrency <= 0:
+            return True
+        with self._condition:
+            self._waiting[tenant] += 1
+            try:
+                acquired = self._condition.wait_for(lambda: self._can_start(tenant),
+                                                    timeout=self.acquire_timeout)
+            finally:
+                self._waiting[tenant] -= 1
+                if not self._waiting[tenant]:
+                    del self._waiting[tenant]
+            if acquired:
+                self._inflight[tenant] += 1
+            else:
+                # Состав активных клиентов изменился — доли других могли вырасти
+                self._condition.notify_all()
+            return acquired
+
+    def release(self, tenant):
+        """Освобождает слот upstream клиента."""
+        if self.max_concurrency <= 0:
+            return
+        with self._condition:
+            self._inflight[tenant] -= 1
+            if not self._inflight[tenant]:
+                del self._inflight[tenant]
+            self._condition.notify_all()
@@ -0,0 +1,152 @@
+# Прогрев воркера при старте: DNS, пул соединений, шаблоны и снимок кэша
+import threading  # Для флага готовности и фонового прогрева
+import time  # Для замера длительности прогрева
+
+
+class WarmupState:
+    """
+    Состояние прогрева приложения, на которое смотрит эндпоинт готовности.
+
+    Атрибуты:
+    - ready (bool): Прогрев завершен, воркер можно пускать под нагрузку
+    - steps (dict): Длительность каждого шага прогрева в секундах
+    - errors (dict): Ошибки шагов прогрева (шаг -> текст ошибки)
+    """
+
+    def __init__(self):
+        self._ready = threading.Event()
+        self.steps = {}
+        self.errors = {}
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def mark_ready(self):
+        self._ready.set()
+
+    def wait(self, timeout=None):
+        """Ждет завершения прогрева. Возвращает True, если прогрев завершен."""
+        return self._ready.wait(timeout)
+
+    def run_step(self, name, func, *args, **kwargs):
+        """
+        Выполняет шаг прогрева, замеряя время и сохраняя ошибку вместо исключения.
+
+        Ошибка одного шага не должна мешать воркеру стартовать: холодный, но
+        работающий воркер лучше, чем воркер, который не поднялся вовсе.
+        """
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:  # noqa: BLE001 — любой сбой прогрева не фатален
+            self.errors[name] = str(e)
+            return None
+        finally:
+            self.steps[name] = time.perf_counter() - started
+
+
+def resolve_host(url):
+    """
+    Заранее разрешает DNS-имя хоста из URL, чтобы ответ попал в кэш резолвера.
+
+    Параметры:
+    - url (str): URL, например API_ENDPOINT
+
+    Возвращает:
+    - list: Список адресов, полученных от getaddrinfo
+    """
+    import socket  # Нужны только при прогреве
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+
+
+def prewarm_connections(session, url, count=1, timeout=5):
+    """
+    Открывает соединения с upstream заранее, чтобы они осели в пуле сессии.
+
+    Соединения открываются параллельно: последовательные запросы переиспользовали
+    бы одно и то же соединение и прогрели бы только его.
+
+    Параметры:
+    - session (requests.Session): Сессия с пулом соединений
+    - url (str): URL upstream
+    - count (int): Сколько соединений открыть
+    - timeout (float): Таймаут одного запроса в секундах
+
+    Возвращает:
+    - int: Количество соединений, открытых без ошибок
+    """
+    from concurrent.futures import ThreadPoolExecutor  # Нужен только при прогреве
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    base_url = f"{parts.scheme}://{parts.netloc}/"
+
+    def open_connection(_):
+        # Код ответа не важен — важно, что TCP/TLS-рукопожатие уже выполнено
+        session.head(base_url, timeout=timeout)
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        results = list(executor.map(lambda i: _succeeded(open_connection, i), range(count)))
+    if not any(results):
+        raise ConnectionError(f"Не удалось открыть ни одного соединения с {base_url}")
+    return sum(results)
+
+
+def _succeeded(func, *args):
+    """Вызывает func и возвращает True, если исключения не было."""
+    try:
+        func(*args)
+        return True
+    except Exception:  # noqa: BLE001
+        return False
+
+
+def load_snapshot(path):
+    """
+    Загружает снимок кэша ответов из локального JSON-файла.
+
+    Параметры:
+    - path (str): Путь к файлу снимка
+
+    Возвращает:
+    - dict: Пары "ключ кэша -> ответ модели"
+    """
+    import json  # Нужен только при работе со снимком
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"Снимок кэша должен быть JSON-объектом: {path}")
+    return data
+
+
+def save_snapshot(path, entries):
+    """
+    Сохраняет снимок кэша ответов в локальный JSON-файл.
+
+    Запись идет в уникальный временный файл рядом со снимком с последующей
+    атомарной заменой: стартующий воркер никогда не прочитает недописанный
+    снимок, а воркеры, останавливающиеся одновременно, не пишут в один файл.
+
+    Параметры:
+    - path (str): Путь к файлу снимка
+    - entries (dict): Пары "ключ кэша -> ответ модели"
+    """
+    import json  # Нужен только при работе со снимком
+    import os
+    import tempfile
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp',
+                                    dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
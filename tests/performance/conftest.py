@@ -0,0 +1,177 @@
+# Общие фикстуры для тестов производительности: бюджеты, базовая линия и фейковый upstream
+import pytest  # Фреймворк для тестирования
+import json  # Для чтения и записи файла базовой линии
+import os  # Для путей и переменных окружения
+import sys  # Для добавления пути
+import socket  # Для TCP_NODELAY на соединениях фейкового upstream
+import threading  # Для фонового HTTP-сервера
+import time  # Для имитации задержки upstream
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Локальный фейковый upstream
+from unittest.mock import patch  # Для подмены API_ENDPOINT
+
+# Добавляем путь к src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+# Файл с сохраненной базовой линией и бюджетами
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Допустимое ухудшение относительно базовой линии (1.0 = вдвое хуже).
+# Микробенчмарки в доли миллисекунды на общих CI-машинах шумят на десятки процентов,
+# поэтому по умолчанию ловим только кратные регрессии; строже — через PERF_TOLERANCE.
+DEFAULT_TOLERANCE = 1.0
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--perf-update-baseline', action='store_true', default=False,
+        help="Перезаписать tests/performance/baseline.json текущими измерениями",
+    )
+
+
+class PerfBudget:
+    """
+    Проверка метрик производительности против базовой линии и бюджетов.
+
+    Каждая метрика в baseline.json описывается так:
+    {"value": 1.2, "budget": 5.0, "unit": "ms", "higher_is_better": false}
+
+    - value: измерение, сохраненное как базовая линия
+    - budget: жесткий предел, который нельзя превышать никогда
+    - higher_is_better: true для пропускной способности, false для задержки и памяти
+
+    Метрика проваливает прогон, если нарушает бюджет или ухудшилась
+    относительно value больше, чем на допуск PERF_TOLERANCE.
+    """
+
+    def __init__(self, baseline, update, tolerance):
+        self.baseline = baseline
+        self.update = update
+        self.tolerance = tolerance
+        self.measured = {}
+
+    def check(self, name, value, unit, budget=None, higher_is_better=False):
+        """
+        Проверяет метрику и запоминает измерение.
+
+        Параметры:
+        - name (str): Имя метрики
+        - value (float): Измеренное значение
+        - unit (str): Единица измерения (для отчета)
+        - budget (float): Жесткий предел для новой метрики, если ее нет в baseline.json
+        - higher_is_better (bool): Направление метрики
+        """
+        entry = self.baseline.get(name, {})
+        budget = entry.get('budget', budget)
+        self.measured[name] = {
+            'value': round(value, 4),
+            'budget': budget,
+            'unit': unit,
+            'higher_is_better': higher_is_better,
+        }
+        if self.update:
+            return
+
+        if budget is not None:
+            within_budget = value >= budget if higher_is_better else value <= budget
+            assert within_budget, f"{name}: {value:.4f} {unit} нарушает бюджет {budget} {unit}"
+
+        base = entry.get('value')
+        if base:
+            if higher_is_better:
+                # "Вдвое хуже" для пропускной способности — вдвое меньше, а не ноль
+                limit = base / (1 + self.tolerance)
+                assert value >= limit, (
+                    f"{name}: регрессия {value:.4f} {unit} < {limit:.4f} {unit} "
+                    f"(базовая линия {base} {unit}, допуск {self.tolerance:.0%})")
+            else:
+                limit = base * (1 + self.tolerance)
+                assert value <= limit, (
+                    f"{name}: регрессия {value:.4f} {unit} > {limit:.4f} {unit} "
+                    f"(базовая линия {base} {unit}, допуск {self.tolerance:.0%})")
+
+
+@pytest.fixture(scope='session')
+def perf_budget(request):
+    """
+    Фикстура бюджетов производительности.
+
+    При запуске с --perf-update-baseline измерения сохраняются в baseline.json.
+    """
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            baseline = json.load(f)
+    update = request.config.getoption('--perf-update-baseline')
+    tolerance = float(os.getenv('PERF_TOLERANCE', DEFAULT_TOLERANCE))
+    budget = PerfBudget(baseline, update, tolerance)
+
+    yield budget
+
+    if update and budget.measured:
+        merged = {**baseline, **budget.measured}
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(dict(sorted(merged.items())), f, ensure_ascii=False, indent=2)
+            f.write('\n')
+
+
+def benchmark_median_ms(benchmark):
+    """Возвращает медиану бенчмарка в миллисекундах или None, если бенчмарки отключены."""
+    if not benchmark.enabled or benchmark.stats is None:
+        return None
+    return benchmark.stats.stats.median * 1000
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    """Обработчик фейкового upstream: отвечает как API mentorpiece после задержки."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, чтобы пул соединений работал как с реальным API
+    delay = 0.0
+
+    def setup(self):
+        super().setup()
+        # Без TCP_NODELAY заголовки и тело уходят разными сегментами и ответ
+        # задерживается на delayed ACK (~40 мс), что исказило бы замеры
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        if self.delay:
+            time.sleep(self.delay)
+        body = json.dumps({"response": "Фейковый ответ upstream"}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Не засоряем вывод тестов
+
+
+@pytest.fixture
+def fake_upstream():
+    """
+    Фикстура локального фейкового upstream.
+
+    Поднимает HTTP-сервер на 127.0.0.1 с задержкой ответа 10 мс, направляет
+    на него API_ENDPOINT и использует пул соединений на 64 соединения.
+    """
+    import app as app_module
+    from tenants import UpstreamConfig
+
+    handler = type('Handler', (FakeUpstreamHandler,), {'delay': 0.01})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/process-ai-request"
+    with patch.object(app_module, 'API_ENDPOINT', url), \
+         patch.object(app_module, '_session', None), \
+         patch.object(app_module, 'UPSTREAM_CONFIG', UpstreamConfig(['perf_test_key'])):
+        app_module.get_session(pool_size=64)
+        yield url
+
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,55 @@
+# Импорт необходимых библиотек для тестирования проверки бюджетов производительности
+import pytest  # Фреймворк для тестирования
+
+from conftest import PerfBudget  # Проверка метрик против базовой линии и бюджетов
+
+
+class TestPerfBudget:
+    """
+    Класс для тестирования PerfBudget.check в обоих направлениях метрик.
+    """
+
+    def make_budget(self, higher_is_better):
+        baseline = {'metric': {'value': 100.0, 'budget': None, 'unit': 'u',
+                               'higher_is_better': higher_is_better}}
+        return PerfBudget(baseline, update=False, tolerance=1.0)
+
+    def test_lower_is_better_regression(self):
+        """
+        Тест задержки: допуск 1.0 пропускает рост до 2x и ловит больший.
+        """
+        budget = self.make_budget(higher_is_better=False)
+
+        budget.check('metric', 200.0, 'u')
+        with pytest.raises(AssertionError, match="регрессия"):
+            budget.check('metric', 201.0, 'u')
+
+    def test_higher_is_better_regression(self):
+        """
+        Тест пропускной способности: допуск 1.0 пропускает падение до 1/2 и ловит большее.
+        """
+        budget = self.make_budget(higher_is_better=True)
+
+        budget.check('metric', 50.0, 'u', higher_is_better=True)
+        with pytest.raises(AssertionError, match="регрессия"):
+            budget.check('metric', 49.0, 'u', higher_is_better=True)
+
+    @pytest.mark.parametrize("higher_is_better, value", [(False, 11.0), (True, 9.0)])
+    def test_hard_budget(self, higher_is_better, value):
+        """
+        Тест жесткого бюджета: нарушение бюджета проваливает проверку в обоих направлениях.
+        """
+        budget = PerfBudget({}, update=False, tolerance=1.0)
+
+        with pytest.raises(AssertionError, match="бюджет"):
+            budget.check('new_metric', value, 'u', budget=10.0, higher_is_better=higher_is_better)
+
+    def test_update_mode_only_records(self):
+        """
+        Тест режима обновления: измерение запоминается без проверок.
+        """
+        budget = PerfBudget({'metric': {'value': 1.0}}, update=True, tolerance=0.0)
+
+        budget.check('metric', 1000.0, 'u', budget=10.0)
+
+        assert budget.measured['metric']['value'] == 1000.0
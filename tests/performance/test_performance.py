@@ -1,32 +1,45 @@
 # Импорт необходимых библиотек для тестирования производительности
 import pytest  # Фреймворк для тестирования
 from unittest.mock import patch, MagicMock  # Для создания моков
+from concurrent.futures import ThreadPoolExecutor  # Для конкурентной нагрузки
+from itertools import cycle  # Для повторения ответов мока
+import os  # Для построения пути к src
 import sys  # Для добавления пути
+import threading  # Для барьера одновременного старта запросов
+import tracemalloc  # Для измерения памяти
 
 # Добавляем путь к src
-sys.path.insert(0, '/workspaces/AI.J.3.4/src')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
 
-from app import call_llm  # Импорт тестируемой функции
+from app import call_llm, app  # Импорт тестируемых объектов
+from flask import render_template  # Для замера рендеринга шаблона
+from conftest import benchmark_median_ms  # Медиана бенчмарка в миллисекундах
+from tenants import UpstreamConfig  # Конфигурация ключей upstream
+
+# Данные формы, используемые во всех тестах роута
+FORM_DATA = {'text': 'Hello world', 'language': 'Русский'}
+
+# Минимальная пропускная способность (запросов/с) при заданной конкурентности
+THROUGHPUT_BUDGETS = {1: 20.0, 8: 80.0, 64: 100.0}
 
 
 class TestPerformance:
     """
     Класс для тестов производительности.
-    Эти тесты проверяют, что функции выполняются в приемлемое время.
+    Эти тесты проверяют, что функции выполняются в приемлемое время и
+    не регрессируют относительно базовой линии (tests/performance/baseline.json).
     """
 
     @patch('app.requests.post')  # Мокаем HTTP-запросы
-    @patch('app.os.getenv')  # Мокаем переменные окружения
-    def test_call_llm_performance(self, mock_getenv, mock_post, benchmark):
+    @patch('app.UPSTREAM_CONFIG', UpstreamConfig(['test_api_key']))  # Настоящая конфигурация: замеряем и выбор ключа
+    def test_call_llm_performance(self, mock_post, benchmark, perf_budget):
         """
         Тест производительности функции call_llm.
 
-        Этот тест измеряет время выполнения функции call_llm с моками.
+        Этот тест измеряет время выполнения функции call_llm с замоканным HTTP.
         Использует pytest-benchmark для точных измерений.
-        Ожидаемое время: менее 1 секунды для мокового вызова.
         """
         # Настройка моков
-        mock_getenv.return_value = 'test_api_key'
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"response": "Mocked response"}
@@ -42,39 +55,119 @@ class TestPerformance:
 
         # Проверки
         assert result is not None  # Функция должна вернуть результат
-        # Статистика выводится автоматически pytest-benchmark
-        print(f"Результат бенчмарка доступен в benchmark.stats")
+        median = benchmark_median_ms(benchmark)
+        if median is not None:
+            perf_budget.check('call_llm_overhead_ms', median, 'ms', budget=1.0)
 
     @patch('app.call_llm')  # Мокаем call_llm для тестирования роута
-    def test_index_route_performance(self, mock_call_llm, benchmark, client):
+    def test_index_route_performance(self, mock_call_llm, benchmark, client, perf_budget):
         """
         Тест производительности роута index при POST-запросе.
 
-        Измеряет время обработки формы с переводом и оценкой.
+        Upstream замокан, поэтому измеряется чистый Python-оверхед запроса:
+        разбор формы, рендеринг промптов, рендеринг шаблона.
         """
         with client.application.test_client() as test_client:
             # Настройка мока - используем cycle для повторения ответов
-            from itertools import cycle
             mock_call_llm.side_effect = cycle(["Переведенный текст", "Оценка: 8/10"])
 
             # Функция для бенчмаркинга
             def run_post_request():
-                return test_client.post('/', data={
-                    'text': 'Hello world',
-                    'language': 'Русский'
-                })
+                return test_client.post('/', data=FORM_DATA)
 
             # Запуск бенчмарка
             result = benchmark(run_post_request)
 
             # Проверки
             assert result.status_code == 200
-            # Статистика выводится автоматически
+            median = benchmark_median_ms(benchmark)
+            if median is not None:
+                perf_budget.check('index_request_overhead_ms', median, 'ms', budget=5.0)
+
+    @pytest.mark.parametrize("size", [100, 10_000, 100_000])
+    def test_template_render_performance(self, size, benchmark, perf_budget):
+        """
+        Тест стоимости рендеринга index.html в зависимости от размера результата.
+
+        Рендеринг линейно зависит от объема текста (экранирование HTML),
+        поэтому замеряется на нескольких размерах.
+        """
+        text = "Пример текста <b>с разметкой</b>. " * (size // 34 + 1)
+        text = text[:size]
+
+        def run_render():
+            with app.test_request_context('/'):
+                return render_template('index.html', original=text, translated=text,
+                                       evaluation=text, language='Английский')
+
+        html = benchmark(run_render)
+
+        assert len(html) > 3 * size
+        median = benchmark_median_ms(benchmark)
+        if median is not None:
+            perf_budget.check(f'template_render_{size}_ms', median, 'ms', budget=50.0)
+
+    @pytest.mark.parametrize("concurrency", [1, 8, 64])
+    def test_throughput(self, concurrency, fake_upstream, benchmark, perf_budget):
+        """
+        Тест пропускной способности index при разной конкурентности.
+
+        Запросы идут через настоящий call_llm в локальный фейковый upstream
+        с задержкой 10 мс, поэтому измеряется и ожидание сети, и оверхед приложения.
+        """
+        total_requests = max(64, concurrency * 4)
+
+        def post_once(_):
+            with app.test_client() as test_client:
+                return test_client.post('/', data=FORM_DATA).status_code
+
+        def run_batch():
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                return list(executor.map(post_once, range(total_requests)))
+
+        statuses = benchmark.pedantic(run_batch, rounds=3, iterations=1)
+
+        assert statuses == [200] * total_requests
+        median = benchmark_median_ms(benchmark)
+        if median is not None:
+            rps = total_requests / (median / 1000)
+            perf_budget.check(f'throughput_c{concurrency}_rps', rps, 'req/s',
+                              budget=THROUGHPUT_BUDGETS[concurrency], higher_is_better=True)
+
+    def test_memory_per_inflight_request(self, fake_upstream, perf_budget):
+        """
+        Тест памяти на один запрос "в полете".
+
+        64 запроса стартуют одновременно и одновременно ждут upstream;
+        пик выделенной памяти делится на число запросов.
+        """
+        concurrency = 64
+        barrier = threading.Barrier(concurrency)
+
+        def post_once(_):
+            with app.test_client() as test_client:
+                barrier.wait()
+                return test_client.post('/', data=FORM_DATA).status_code
+
+        # Прогревочный запрос, чтобы не учитывать одноразовые выделения (импорты, кэш Jinja)
+        post_once_warm = app.test_client().post('/', data=FORM_DATA)
+        assert post_once_warm.status_code == 200
+
+        tracemalloc.start()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                statuses = list(executor.map(post_once, range(concurrency)))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        assert statuses == [200] * concurrency
+        perf_budget.check('memory_per_inflight_request_kib', peak / concurrency / 1024, 'KiB',
+                          budget=512.0)
 
 
 # Фикстура для клиента (если нужно)
 @pytest.fixture
 def client():
-    from app import app
     app.config['TESTING'] = True
-    return app.test_client()
\ No newline at end of file
+    return app.test_client()
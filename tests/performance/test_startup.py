@@ -0,0 +1,61 @@
+# Импорт необходимых библиотек для бенчмарка времени старта
+import pytest  # Фреймворк для тестирования
+from unittest.mock import patch  # Для отключения сети при прогреве
+import os  # Для построения пути к src
+import subprocess  # Для замера холодного импорта в отдельном процессе
+import sys  # Для добавления пути
+
+# Путь к src
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+sys.path.insert(0, SRC_DIR)
+
+import app as app_module  # Импорт модуля приложения целиком (нужен доступ к сессии)
+from app import create_app  # Фабрика приложения
+from conftest import benchmark_median_ms  # Медиана бенчмарка в миллисекундах
+
+
+
+@pytest.fixture(autouse=True)
+def isolated_session():
+    """
+    Фикстура изоляции: прогрев создает общую HTTP-сессию на уровне модуля,
+    после теста она сбрасывается, чтобы другие тесты мокали requests.post как раньше.
+    """
+    with patch.object(app_module, '_session', None):
+        yield
+
+
+class TestStartupPerformance:
+    """
+    Класс для бенчмарков времени старта воркера.
+    """
+
+    def test_cold_import_time(self, benchmark, perf_budget):
+        """
+        Бенчмарк холодного импорта модуля app в новом интерпретаторе.
+
+        Это то, что платит каждый новый воркер при автоскейлинге.
+        """
+        def run_import():
+            return subprocess.run([sys.executable, '-c', 'import app'], cwd=SRC_DIR,
+                                  env={**os.environ, 'WARMUP': '0'}, check=True)
+
+        result = benchmark.pedantic(run_import, rounds=5, iterations=1)
+
+        assert result.returncode == 0
+        median = benchmark_median_ms(benchmark)
+        if median is not None:
+            perf_budget.check('cold_import_ms', median, 'ms', budget=1000.0)
+
+    @patch('warmup.prewarm_connections')  # Сеть не нужна: измеряем собственные затраты прогрева
+    @patch('warmup.resolve_host')
+    def test_create_app_with_warmup(self, mock_resolve, mock_prewarm, benchmark, perf_budget):
+        """
+        Бенчмарк фабрики приложения с прогревом (компиляция шаблонов и т.д.).
+        """
+        flask_app = benchmark(create_app, {'WARMUP': True})
+
+        assert flask_app.extensions['warmup'].ready
+        median = benchmark_median_ms(benchmark)
+        if median is not None:
+            perf_budget.check('create_app_warmup_ms', median, 'ms', budget=50.0)
@@ -18,8 +18,8 @@ class TestCallLLM:
     """
 
     @patch('app.requests.post')  # Мокаем requests.post, чтобы не делать реальные HTTP-запросы
-    @patch('app.os.getenv')  # Мокаем os.getenv для контроля переменных окружения
-    def test_call_llm_success_worker_model(self, mock_getenv, mock_post):
+    @patch('app.UPSTREAM_CONFIG')  # Мокаем конфигурацию upstream для контроля API ключа
+    def test_call_llm_success_worker_model(self, mock_config, mock_post):
         """
         Positive Test: Проверка успешного вызова для Worker модели (перевод).
         
@@ -27,7 +27,7 @@ class TestCallLLM:
         для модели перевода и возвращает ожидаемый текст.
         """
         # Настройка моков
-        mock_getenv.return_value = 'test_api_key'  # Мокаем API ключ
+        mock_config.key_for.return_value = 'test_api_key'  # Мокаем API ключ
         mock_response = MagicMock()  # Создаем мок для ответа
         mock_response.status_code = 200  # Успешный статус
         mock_response.json.return_value = {"response": "Mocked translation text"}  # Фиктивный перевод
@@ -45,14 +45,14 @@ class TestCallLLM:
         assert "Authorization" in kwargs['headers']  # Проверяем, что API ключ передан в заголовках
 
     @patch('app.requests.post')
-    @patch('app.os.getenv')
-    def test_call_llm_success_judge_model(self, mock_getenv, mock_post):
+    @patch('app.UPSTREAM_CONFIG')
+    def test_call_llm_success_judge_model(self, mock_config, mock_post):
         """
         Positive Test: Проверка успешного вызова для Judge модели (оценка).
         
         Аналогично предыдущему тесту, но для модели оценки качества перевода.
         """
-        mock_getenv.return_value = 'test_api_key'
+        mock_config.key_for.return_value = 'test_api_key'
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.json.return_value = {"response": "Mocked evaluation: 9/10, excellent translation"}
@@ -63,31 +63,31 @@ class TestCallLLM:
         assert result == "Mocked evaluation: 9/10, excellent translation"
         mock_post.assert_called_once()
 
-    @patch('app.os.getenv')
-    def test_call_llm_api_key_missing(self, mock_getenv):
+    @patch('app.UPSTREAM_CONFIG')
+    def test_call_llm_api_key_missing(self, mock_config):
         """
-        Environment Test: Проверка загрузки API ключа из переменных окружения.
+        Environment Test: Проверка загрузки API ключа из конфигурации upstream.
         
         Этот тест проверяет, что функция правильно обрабатывает отсутствие API ключа
         и возвращает соответствующее сообщение об ошибке.
         """
-        mock_getenv.return_value = None  # Мокаем отсутствие API ключа
+        mock_config.key_for.return_value = None  # Мокаем отсутствие API ключа
 
         result = call_llm("any_model", "any_prompt")
 
-        assert result == "Ошибка: API ключ не найден в переменных окружения."
+        assert result == "Ошибка: API ключ не настроен для клиента (API_KEY, API_KEYS или TENANT_KEYS)."
         # Убеждаемся, что requests.post не был вызван, так как API ключ отсутствует
 
     @patch('app.requests.post')
-    @patch('app.os.getenv')
-    def test_call_llm_request_exception(self, mock_getenv, mock_post):
+    @patch('app.UPSTREAM_CONFIG')
+    def test_call_llm_request_exception(self, mock_config, mock_post):
         """
         Error Handling: Проверка обработки сетевых ошибок.
         
         Этот тест мокает ситуацию, когда requests.post выбрасывает исключение
         (например, проблемы с сетью), и проверяет, что функция корректно обрабатывает ошибку.
         """
-        mock_getenv.return_value = 'test_api_key'
+        mock_config.key_for.return_value = 'test_api_key'
         import requests
         mock_post.side_effect = requests.exceptions.RequestException("Network error")  # Мокаем исключение типа RequestException
 
@@ -97,15 +97,15 @@ class TestCallLLM:
         assert "Network error" in result
 
     @patch('app.requests.post')
-    @patch('app.os.getenv')
-    def test_call_llm_api_error(self, mock_getenv, mock_post):
+    @patch('app.UPSTREAM_CONFIG')
+    def test_call_llm_api_error(self, mock_config, mock_post):
         """
         Error Handling: Проверка обработки ошибок API (не 200 статус).
         
         Этот тест мокает ситуацию, когда API возвращает ошибочный статус код,
         и проверяет корректную обработку такой ситуации.
         """
-        mock_getenv.return_value = 'test_api_key'
+        mock_config.key_for.return_value = 'test_api_key'
         mock_response = MagicMock()
         mock_response.status_code = 401  # Ошибка аутентификации
         mock_response.text = "Unauthorized"
@@ -0,0 +1,215 @@
+# Импорт необходимых библиотек для тестирования инкрементального перевода
+import pytest  # Фреймворк для тестирования
+from unittest.mock import patch  # Для мокирования вызовов LLM
+import os  # Для построения пути к src
+import re  # Для извлечения result_id из HTML
+import sys  # Для добавления пути
+
+# Добавляем путь к src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from app import create_app  # Фабрика приложения
+from incremental import (  # Сегментация и дифф
+    Chunk, chunk_segments, plan_update, split_long_segments, split_segments,
+)
+from prompts import WORKER_MODEL, estimate_tokens  # Модель-переводчик и оценка токенов
+
+# Длинный текст из пяти предложений
+TEXT = "Первое предложение. Второе предложение. Третье предложение. Четвертое предложение. Пятое предложение."
+
+
+def fake_llm(model_name, prompt, tenant=None):
+    """Фейковая модель: переводчик возвращает текст в верхнем регистре, оценщик — 8/10."""
+    if model_name == WORKER_MODEL:
+        return prompt.split(': ', 1)[1].upper()
+    return "8/10"
+
+
+class TestSegments:
+    """
+    Класс для тестирования сегментации и диффа по сегментам.
+    """
+
+    @pytest.mark.parametrize("text", [
+        "Hello world",
+        "Привет. Как дела?  Хорошо!\nНовая строка\n\nЕще. ",
+        "3.14 is pi. \"Quote.\" End",
+        "",
+    ])
+    def test_split_segments_is_lossless(self, text):
+        """
+        Тест сегментации: склейка сегментов равна исходному тексту.
+        """
+        assert ''.join(split_segments(text)) == text
+
+    @pytest.mark.parametrize("segment", ["слово " * 500, "x" * 3000, "строка\n" * 300])
+    def test_split_long_segments_fits_budget_losslessly(self, segment):
+        """
+        Тест дробления: части длинного сегмента укладываются в бюджет и склеиваются без потерь.
+        """
+        parts = split_long_segments(["Коротко. ", segment], max_tokens=50)
+
+        assert parts[0] == "Коротко. "
+        assert ''.join(parts[1:]) == segment
+        assert all(estimate_tokens(part) <= 50 for part in parts)
+
+    def test_plan_update_reuses_unchanged_chunks(self):
+        """
+        Тест диффа: неизмененные чанки переиспользуются, новый сегмент попадает в новый чанк.
+        """
+        chunks = chunk_segments(split_segments("A one. B two. C three. "), max_tokens=3)
+        for chunk in chunks:
+            chunk.translation = chunk.source.upper()
+
+        plan = plan_update(chunks, split_segments("A one. B changed. C three. "), max_tokens=3)
+
+        assert [chunk.source for chunk in plan] == ["A one. ", "B changed. ", "C three. "]
+        assert [chunk.translation for chunk in plan] == ["A ONE. ", None, "C THREE. "]
+
+    def test_plan_update_insertion_inside_chunk_invalidates_it(self):
+        """
+        Тест диффа: вставка внутрь чанка требует его повторного перевода.
+        """
+        chunks = [Chunk(["A. ", "B. "], "a. b. ")]
+
+        plan = plan_update(chunks, ["A. ", "X. ", "B. "], max_tokens=100)
+
+        assert len(plan) == 1
+        assert plan[0].translation is None
+        assert plan[0].segments == ("A. ", "X. ", "B. ")
+
+
+class TestIncrementalRoute:
+    """
+    Класс для тестирования инкрементального режима роута index.
+    """
+
+    def submit(self, client, text, result_id='', language='Английский'):
+        response = client.post('/', data={'text': text, 'language': language,
+                                          'result_id': result_id})
+        assert response.status_code == 200
+        html = response.data.decode('utf-8')
+        return html, re.search(r'name="result_id" value="([0-9a-f]+)"', html).group(1)
+
+    @patch('app.call_llm', side_effect=fake_llm)
+    def test_resubmit_translates_only_changed_segment(self, mock_call, client):
+        """
+        Тест правки: после изменения одного предложения переводится и оценивается только оно.
+        """
+        html, result_id = self.submit(client, TEXT)
+        first_run_calls = mock_call.call_count
+        assert first_run_calls == 10  # Пять чанков + пять оценок чанков
+        mock_call.reset_mock()
+
+        edited = TEXT.replace("Третье предложение.", "Третье исправленное предложение.")
+        html, new_result_id = self.submit(client, edited, result_id)
+
+        assert new_result_id == result_id
+        assert mock_call.call_count == 2  # Один чанк + одна оценка
+        translation_prompt = mock_call.call_args_list[0].args[1]
+        evaluation_prompt = mock_call.call_args_list[1].args[1]
+        assert translation_prompt.endswith("Третье исправленное предложение.")
+        assert "Первое" not in evaluation_prompt
+        assert "ТРЕТЬЕ ИСПРАВЛЕННОЕ ПРЕДЛОЖЕНИЕ." in evaluation_prompt
+        assert edited.upper() in html
+        assert "1 из 5" in html
+        assert "по 5 из 5 фрагментов" in html  # Итог относится ко всему тексту, а не к правке
+
+    @patch('app.call_llm', side_effect=fake_llm)
+    def test_resubmit_reaggregates_whole_document_score(self, mock_call, client):
+        """
+        Тест правки: оценка измененного фрагмента не выдается за оценку всего текста,
+        итог пересчитывается вместе с прежними оценками неизмененных фрагментов.
+        """
+        _, result_id = self.submit(client, TEXT)
+
+        def harsh_judge(model_name, prompt, tenant=None):
+            return fake_llm(model_name, prompt) if model_name == WORKER_MODEL else "2/10"
+
+        mock_call.side_effect = harsh_judge
+        edited = TEXT.replace("Третье предложение.", "Третье исправленное предложение.")
+        html, _ = self.submit(client, edited, result_id)
+
+        assert "Итоговая оценка: 2/10" not in html
+        assert "Итоговая оценка: 6.3/10" in html  # Среднее 8 и 2, взвешенное по длине фрагментов
+        assert "по 5 из 5 фрагментов" in html
+
+    @patch('app.call_llm', side_effect=fake_llm)
+    def test_unpunctuated_long_text_edit_reuses_chunks(self, mock_call, client):
+        """
+        Тест длинного абзаца без знаков препинания: он дробится на чанки, и правка
+        в конце абзаца переводит заново только последний чанк.
+        """
+        text = "слово " * 200
+        html, result_id = self.submit(client, text)
+        assert "слишком длинный" not in html
+        first_run_chunks = mock_call.call_count // 2
+        assert first_run_chunks > 1
+        mock_call.reset_mock()
+
+        html, _ = self.submit(client, text[:-len("слово ")] + "конец ", result_id)
+
+        assert mock_call.call_count == 2  # Один чанк + одна оценка
+        assert f"1 из {first_run_chunks}" in html
+
+    @patch('app.call_llm')
+    def test_single_fragment_shows_judge_reply(self, mock_call, client):
+        """
+        Тест короткого текста: при одном фрагменте показывается аргументация оценщика.
+        """
+        mock_call.side_effect = ["Hello.", "Оценка: 8/10. Перевод точный."]
+
+        html, _ = self.submit(client, "Привет.")
+
+        assert "Оценка: 8/10. Перевод точный." in html
+
+    @patch('app.call_llm', side_effect=fake_llm)
+    def test_unchanged_resubmit_makes_no_calls(self, mock_call, client):
+        """
+        Тест повторной отправки без правок: модель не вызывается вовсе.
+        """
+        _, result_id = self.submit(client, TEXT)
+        mock_call.reset_mock()
+
+        html, _ = self.submit(client, TEXT, result_id)
+
+        assert mock_call.call_count == 0
+        assert "8/10" in html
+
+    @patch('app.call_llm', side_effect=fake_llm)
+    def test_resubmit_keeps_non_default_language(self, mock_call, client):
+        """
+        Тест формы: выбранный язык остается выбранным, поэтому правка на немецком
+        переиспользует прежний перевод, а не уходит заново на английский.
+        """
+        html, result_id = self.submit(client, TEXT, language='Немецкий')
+        selected = re.findall(r'<option value="([^"]+)" selected>', html)
+        assert selected == ['Немецкий']
+        mock_call.reset_mock()
+
+        edited = TEXT.replace("Третье предложение.", "Третье исправленное предложение.")
+        html, new_result_id = self.submit(client, edited, result_id, language=selected[0])
+
+        assert new_result_id == result_id
+        assert mock_call.call_count == 2
+        assert "на Немецкий" in mock_call.call_args_list[0].args[1]
+
+    @patch('app.call_llm', side_effect=fake_llm)
+    def test_language_change_retranslates_everything(self, mock_call, client):
+        """
+        Тест смены языка: предыдущий перевод не переиспользуется.
+        """
+        _, result_id = self.submit(client, TEXT)
+        mock_call.reset_mock()
+
+        client.post('/', data={'text': TEXT, 'language': 'Немецкий', 'result_id': result_id})
+
+        assert mock_call.call_count == 10
+
+
+# Фикстура для клиента приложения с включенным инкрементальным режимом
+@pytest.fixture
+def client():
+    flask_app = create_app({'WARMUP': False, 'TESTING': True,
+                            'INCREMENTAL_TRANSLATION': True, 'INCREMENTAL_CHUNK_TOKENS': 16})
+    return flask_app.test_client()
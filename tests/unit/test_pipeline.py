@@ -0,0 +1,173 @@
+# Импорт необходимых библиотек для тестирования конвейерной оценки
+import pytest  # Фреймворк для тестирования
+from unittest.mock import patch  # Для мокирования вызовов LLM
+import os  # Для построения пути к src
+import sys  # Для добавления пути
+import threading  # Для проверки параллельности перевода и оценки
+
+# Добавляем путь к src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from app import create_app, is_error_response  # Фабрика приложения и проверка ошибок
+from incremental import Chunk  # Чанки текста
+from pipeline import SegmentVerdict, aggregate_scores, parse_score, run_pipeline  # Конвейер
+from prompts import WORKER_MODEL  # Модель-переводчик
+
+
+class TestScores:
+    """
+    Класс для тестирования разбора и агрегации оценок фрагментов.
+    """
+
+    @pytest.mark.parametrize("text,expected", [
+        ("Оценка: 8/10. Хороший перевод.", 8.0),
+        ("Я бы поставил 7,5 / 10", 7.5),
+        ("оценка — 9", 9.0),
+        ("Без числовой оценки", None),
+        ("Оценка: 42", None),
+    ])
+    def test_parse_score(self, text, expected):
+        """
+        Тест разбора: оценка извлекается из разных формулировок ответа оценщика.
+        """
+        assert parse_score(text) == expected
+
+    def test_aggregate_is_weighted_by_length(self):
+        """
+        Тест агрегации: длинный фрагмент влияет на итог сильнее короткого.
+        """
+        verdicts = [
+            SegmentVerdict("a" * 400, "", "Оценка: 10/10"),
+            SegmentVerdict("b" * 4, "", "Оценка: 0/10"),
+            SegmentVerdict("c" * 40, "", "нет оценки"),
+        ]
+
+        assert aggregate_scores(verdicts) == 9.9
+        assert aggregate_scores([]) is None
+
+
+class TestRunPipeline:
+    """
+    Класс для тестирования конвейера перевода и оценки.
+    """
+
+    def test_judging_overlaps_translation(self):
+        """
+        Тест конвейера: перевод второго фрагмента ждет начала оценки первого.
+
+        Если бы оценка начиналась только после всего перевода, тест упал бы по таймауту.
+        """
+        first_judged = threading.Event()
+        chunks = [Chunk(["Один. "]), Chunk(["Два. "])]
+
+        def translate(chunk):
+            if chunk is chunks[1]:
+                assert first_judged.wait(timeout=5), "Оценка первого фрагмента не началась"
+            return chunk.source.upper()
+
+        def judge(source, translation):
+            first_judged.set()
+            return "Оценка: 9/10"
+
+        verdicts, failed = run_pipeline(chunks, translate, judge, is_error_response)
+
+        assert failed is None
+        assert [verdict.translation for verdict in verdicts] == ["ОДИН. ", "ДВА. "]
+        assert [verdict.score for verdict in verdicts] == [9.0, 9.0]
+
+    def test_translation_error_stops_pipeline(self):
+        """
+        Тест ошибки: сбой перевода прерывает конвейер и возвращается как ошибка.
+        """
+        chunks = [Chunk(["Один. "]), Chunk(["Два. "]), Chunk(["Три. "])]
+        translated = []
+
+        def translate(chunk):
+            translated.append(chunk)
+            return "Ошибка API: 500 - boom" if chunk is chunks[1] else "ok"
+
+        verdicts, failed = run_pipeline(chunks, translate, lambda s, t: "8/10", is_error_response)
+
+        assert verdicts == []
+        assert failed == "Ошибка API: 500 - boom"
+        assert len(translated) == 2
+
+
+class TestPipelinedRoute:
+    """
+    Класс для тестирования конвейерного режима роута index.
+    """
+
+    @patch('app.call_llm')
+    def test_index_shows_aggregated_verdict(self, mock_call_llm, client):
+        """
+        Тест роута: оценки фрагментов сводятся в итоговую и отображаются по отдельности.
+        """
+        def fake_llm(model_name, prompt, tenant=None):
+            if model_name == WORKER_MODEL:
+                return prompt.split(': ', 1)[1].upper()
+            return "Оценка: 6/10" if "Первое" in prompt else "Оценка: 8/10"
+
+        mock_call_llm.side_effect = fake_llm
+        text = "Первое предложение. Второе предложение. "  # Фрагменты одинаковой длины
+
+        response = client.post('/', data={'text': text, 'language': 'Английский'})
+
+        html = response.data.decode('utf-8')
+        assert response.status_code == 200
+        assert text.upper() in html
+        assert "Итоговая оценка: 7/10" in html
+        assert "Оценки фрагментов" in html
+        assert mock_call_llm.call_count == 4  # Два перевода + две оценки
+
+    @pytest.mark.parametrize("judge_reply", [
+        "Оценка: 8/10. Перевод точный, стиль сохранен.",
+        "Ошибка API: 503 - Service Unavailable",
+    ])
+    @patch('app.call_llm')
+    def test_single_fragment_shows_judge_reply(self, mock_call_llm, judge_reply, client):
+        """
+        Тест роута: для текста из одного фрагмента показывается ответ оценщика целиком
+        (аргументация или ошибка upstream), а не только итоговое число.
+        """
+        mock_call_llm.side_effect = ["Hello.", judge_reply]
+
+        response = client.post('/', data={'text': 'Привет.', 'language': 'Английский'})
+
+        html = response.data.decode('utf-8')
+        assert judge_reply in html
+        assert "Итоговая оценка" not in html
+
+    @patch('app.call_llm')
+    def test_unpunctuated_long_text_is_chunked(self, mock_call_llm):
+        """
+        Тест роута: длинный абзац без знаков препинания дробится на фрагменты,
+        а не отклоняется как один слишком длинный фрагмент.
+        """
+        def fake_llm(model_name, prompt, tenant=None):
+            if model_name == WORKER_MODEL:
+                return prompt.split(': ', 1)[1]
+            return "Оценка: 8/10"
+
+        mock_call_llm.side_effect = fake_llm
+        text = "слово " * 6000
+        client = create_app({'WARMUP': False, 'TESTING': True, 'PIPELINED_JUDGING': True}).test_client()
+
+        response = client.post('/', data={'text': text, 'language': 'Английский'})
+
+        html = response.data.decode('utf-8')
+        assert response.status_code == 200
+        assert "слишком длинный" not in html
+        assert "Итоговая оценка: 8/10" in html
+        translated = [call.args[1].split(': ', 1)[1] for call in mock_call_llm.call_args_list
+                      if call.args[0] == WORKER_MODEL]
+        assert len(translated) > 1
+        assert sum(part.count("слово") for part in translated) == 6000
+
+
+# Фикстура для клиента приложения с включенным конвейерным режимом
+@pytest.fixture
+def client():
+    flask_app = create_app({'WARMUP': False, 'TESTING': True,
+                            'PIPELINED_JUDGING': True, 'PIPELINE_CHUNK_TOKENS': 10})
+    return flask_app.test_client()
@@ -0,0 +1,174 @@
+# Импорт необходимых библиотек для тестирования подсистемы промптов
+import pytest  # Фреймворк для тестирования
+from unittest.mock import patch  # Для мокирования вызовов LLM
+import os  # Для построения пути к src
+import sys  # Для добавления пути
+import threading  # Для подсчета одновременных вызовов модели
+import time  # Для имитации задержки модели
+
+# Добавляем путь к src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from prompts import (  # Импорт подсистемы промптов
+    PromptTemplate, get_prompt, estimate_tokens, truncate_to_tokens,
+    PROMPT_METRICS, TRUNCATION_MARKER, WORKER_MODEL,
+)
+from app import app  # Импорт Flask приложения
+
+
+class TestPrompts:
+    """
+    Класс для тестирования шаблонов промптов, оценки токенов и бюджета.
+    """
+
+    def test_translation_prompt_matches_legacy_format(self):
+        """
+        Тест совместимости: короткий ввод рендерится так же, как прежняя f-строка.
+        """
+        prompt = get_prompt('translation').render(language='Английский', text='Привет')
+
+        assert prompt.text == "Переведи следующий текст на Английский: Привет"
+        assert prompt.model == WORKER_MODEL
+        assert prompt.tag == "translation@v1"
+        assert prompt.truncated is False
+
+    def test_estimate_tokens(self):
+        """
+        Тест оценки токенов: кириллица "дороже" латиницы, пустая строка — 0 токенов.
+        """
+        assert estimate_tokens('') == 0
+        assert estimate_tokens('abcd' * 100) == 100
+        assert estimate_tokens('абвг' * 100) == 200
+
+    def test_truncate_to_tokens_keeps_head_and_tail(self):
+        """
+        Тест обрезки: результат укладывается в бюджет и сохраняет начало и конец.
+        """
+        text = "START " + "x" * 10000 + " END"
+        result = truncate_to_tokens(text, 200)
+
+        assert estimate_tokens(result) <= 200
+        assert result.startswith("START")
+        assert result.endswith("END")
+        assert TRUNCATION_MARKER in result
+
+    @pytest.mark.parametrize("text", [
+        'я' * 10000 + 'a' * 10000,
+        'a' * 10000 + 'я' * 10000,
+        'a😀' * 5000,
+    ])
+    def test_truncate_to_tokens_mixed_scripts_fit_budget(self, text):
+        """
+        Тест обрезки: текст со смешанной плотностью байтов укладывается в бюджет.
+        """
+        result = truncate_to_tokens(text, 1000)
+
+        assert estimate_tokens(result) <= 1000
+        assert result.startswith(text[:100])
+        assert result.endswith(text[-100:])
+
+    def test_render_enforces_budget(self):
+        """
+        Тест контроля бюджета: длинные поля обрезаются, короткие остаются целиком.
+        """
+        template = PromptTemplate('test', 'v2', 'model', "A: {short} B: {long}",
+                                  max_tokens=100, truncatable=('short', 'long'))
+        prompt = template.render(short='hello', long='y' * 5000)
+
+        assert prompt.truncated is True
+        assert prompt.tokens <= 100
+        assert "A: hello B: " in prompt.text
+        assert PROMPT_METRICS['test@v2']['truncated'] >= 1
+
+    def test_cache_key_depends_on_version(self):
+        """
+        Тест ключей кэша: одинаковый текст в разных версиях шаблона дает разные ключи.
+        """
+        v1 = PromptTemplate('same', 'v1', 'model', "{text}", max_tokens=100)
+        v2 = PromptTemplate('same', 'v2', 'model', "{text}", max_tokens=100)
+
+        assert v1.render(text='a').cache_key != v2.render(text='a').cache_key
+
+    def test_unknown_prompt_raises(self):
+        """
+        Тест реестра: запрос неизвестного шаблона приводит к KeyError.
+        """
+        with pytest.raises(KeyError):
+            get_prompt('missing')
+
+    def test_index_translates_oversized_input_in_chunks(self, client):
+        """
+        Тест роута: слишком длинный текст переводится по частям без потери середины,
+        а оценка по сокращенному тексту помечается на странице.
+        """
+        long_text = "Слово " * 50000
+
+        with patch('app.call_llm') as mock_call:
+            mock_call.side_effect = lambda model, prompt, tenant=None: (
+                "Оценка" if model != WORKER_MODEL else prompt.split(': ', 1)[1])
+            response = client.post('/', data={'text': long_text, 'language': 'Английский'})
+
+        assert response.status_code == 200
+        translation_prompts = [call.args[1] for call in mock_call.call_args_list
+                               if call.args[0] == WORKER_MODEL]
+        assert len(translation_prompts) > 1
+        for prompt in translation_prompts:
+            assert estimate_tokens(prompt) <= get_prompt('translation').max_tokens
+            assert TRUNCATION_MARKER not in prompt
+        assert sum(prompt.count("Слово") for prompt in translation_prompts) == 50000
+        assert "сокращенному тексту" in response.data.decode('utf-8')
+
+    def test_oversized_input_parts_are_translated_concurrently(self, client):
+        """
+        Тест роута: части длинного текста переводятся параллельно, а полный промпт
+        перевода не рендерится (и не учитывается в метриках как обрезанный).
+        """
+        long_text = "Слово " * 50000
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def slow_llm(model, prompt, tenant=None):
+            if model != WORKER_MODEL:
+                return "Оценка"
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            with lock:
+                active[0] -= 1
+            return prompt.split(': ', 1)[1]
+
+        truncated_before = PROMPT_METRICS['translation@v1']['truncated']
+        with patch('app.call_llm', side_effect=slow_llm):
+            response = client.post('/', data={'text': long_text, 'language': 'Английский'})
+
+        assert response.status_code == 200
+        assert peak[0] > 1
+        assert PROMPT_METRICS['translation@v1']['truncated'] == truncated_before
+
+    def test_input_over_limit_is_rejected(self, client):
+        """
+        Тест роута: текст больше MAX_INPUT_TOKENS отклоняется с 413 без вызовов upstream.
+        """
+        with patch.dict(app.config, {'MAX_INPUT_TOKENS': 10}), \
+             patch('app.call_llm') as mock_call:
+            response = client.post('/', data={'text': 'word ' * 100, 'language': 'Английский'})
+
+        assert response.status_code == 413
+        assert "слишком длинный" in response.data.decode('utf-8')
+        mock_call.assert_not_called()
+
+    def test_short_input_evaluation_is_not_marked(self, client):
+        """
+        Тест роута: обычная оценка не помечается как выполненная по сокращенному тексту.
+        """
+        with patch('app.call_llm', side_effect=["Перевод", "Оценка"]):
+            response = client.post('/', data={'text': 'Привет', 'language': 'Английский'})
+
+        assert "сокращенному тексту" not in response.data.decode('utf-8')
+
+
+# Фикстура для клиента
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,226 @@
+# Импорт необходимых библиотек для тестирования мультиарендности
+import pytest  # Фреймворк для тестирования
+from unittest.mock import patch, MagicMock  # Для мокирования HTTP и конфигурации
+import json  # Для чтения сброшенной статистики
+import os  # Для построения пути к src
+import sys  # Для добавления пути
+
+# Добавляем путь к src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+import app as app_module  # Импорт модуля приложения целиком (нужен доступ к лимитам и учету)
+from app import app, call_llm  # Импорт Flask приложения и функции вызова LLM
+from tenants import (  # Конфигурация, учет и лимиты клиентов
+    DEFAULT_TENANT, RateLimitExceeded, TenantLimiter, UpstreamConfig, UsageStore,
+)
+
+
+class TestUpstreamConfig:
+    """
+    Класс для тестирования конфигурации ключей upstream.
+    """
+
+    def test_from_env_falls_back_to_single_api_key(self):
+        """
+        Тест совместимости: без API_KEYS используется прежняя переменная API_KEY.
+        """
+        config = UpstreamConfig.from_env({'API_KEY': 'single_key'})
+
+        assert config.key_for(DEFAULT_TENANT) == 'single_key'
+        assert config.key_for('any_tenant') == 'single_key'
+
+    def test_key_pool_mapping_is_stable(self):
+        """
+        Тест пула ключей: клиент всегда получает один и тот же ключ, явный ключ важнее пула.
+        """
+        config = UpstreamConfig.from_env({'API_KEYS': 'k1,k2,k3', 'TENANT_KEYS': 'vip=vip_key'})
+
+        assert config.key_for('acme') == config.key_for('acme')
+        assert config.key_for('acme') in {'k1', 'k2', 'k3'}
+        assert config.key_for('vip') == 'vip_key'
+
+    def test_resolve_tenant_by_secret_token(self):
+        """
+        Тест определения клиента: клиента выдает только секретный токен, а не его имя.
+        """
+        config = UpstreamConfig.from_env({'API_KEY': 'k', 'TENANT_KEYS': 'vip=vip_key',
+                                          'TENANT_TOKENS': 's3cret=vip'})
+
+        assert config.resolve_tenant('s3cret') == 'vip'
+        assert config.resolve_tenant('vip') == DEFAULT_TENANT  # Назваться клиентом нельзя
+        assert config.resolve_tenant('guess') == DEFAULT_TENANT
+        assert config.resolve_tenant(None) == DEFAULT_TENANT
+
+    def test_tokens_and_keys_may_contain_equals(self):
+        """
+        Тест разбора: токены и ключи с "=" (паддинг base64) разбираются целиком.
+        """
+        config = UpstreamConfig.from_env({'TENANT_TOKENS': 'dG9rZW4==acme',
+                                          'TENANT_KEYS': 'acme=a2V5=='})
+
+        assert config.resolve_tenant('dG9rZW4=') == 'acme'
+        assert config.resolve_tenant('dG9rZW4') == DEFAULT_TENANT
+        assert config.key_for('acme') == 'a2V5=='
+
+    def test_invalid_tenant_keys_raise(self):
+        """
+        Тест конфигурации: ошибка в TENANT_KEYS обнаруживается при старте.
+        """
+        with pytest.raises(ValueError):
+            UpstreamConfig.from_env({'TENANT_KEYS': 'no_separator'})
+        with pytest.raises(ValueError, match="TENANT_TOKENS"):
+            UpstreamConfig.from_env({'TENANT_TOKENS': 'token='})
+
+
+class TestUsageStore:
+    """
+    Класс для тестирования учета использования upstream.
+    """
+
+    def test_flush_returns_deltas_and_keeps_totals(self, tmp_path):
+        """
+        Тест сброса: сброс отдает дельты с прошлого сброса и дописывает их в файл.
+        """
+        path = tmp_path / 'usage.jsonl'
+        store = UsageStore(str(path))
+        store.record('acme', prompt_tokens=10, response_tokens=5, latency=0.2)
+        store.record('acme', prompt_tokens=1, response_tokens=1, latency=0.1, error=True)
+
+        delta = store.flush()
+
+        assert delta['acme']['calls'] == 2
+        assert delta['acme']['errors'] == 1
+        assert delta['acme']['prompt_tokens'] == 11
+        assert store.flush() == {}
+        assert store.totals('acme')['calls'] == 2
+        assert json.loads(path.read_text(encoding='utf-8'))['usage']['acme']['calls'] == 2
+
+    def test_flusher_flushes_on_exit(self):
+        """
+        Тест остановки: при запуске фонового сброса регистрируется последний сброс в atexit.
+        """
+        store = UsageStore()
+
+        with patch('tenants.atexit.register') as mock_register:
+            store.start_flusher(3600)
+
+        mock_register.assert_called_once_with(store.flush)
+
+
+class TestTenantLimiter:
+    """
+    Класс для тестирования лимитов клиентов.
+    """
+
+    def test_rate_limit_per_tenant(self):
+        """
+        Тест токен-бакета: после всплеска запросы клиента отклоняются, другие клиенты не страдают.
+        """
+        limiter = TenantLimiter(UpstreamConfig(rate_per_minute=1, burst=2))
+
+        limiter.check_rate('heavy')
+        limiter.check_rate('heavy')
+        with pytest.raises(RateLimitExceeded):
+            limiter.check_rate('heavy')
+        limiter.check_rate('light')
+
+    def test_recovered_buckets_are_evicted(self):
+        """
+        Тест памяти: при переполнении выбрасываются только полностью восстановившиеся бакеты.
+        """
+        limiter = TenantLimiter(UpstreamConfig(rate_per_minute=60, burst=2))
+        with patch('tenants.MAX_TRACKED_BUCKETS', 3), patch('tenants.time.monotonic') as clock:
+            clock.return_value = 0.0
+            for tenant in ('a', 'b', 'c'):
+                limiter.check_rate(tenant)
+            clock.return_value = 0.5  # Бакеты восстановились наполовину — выбрасывать нельзя
+            limiter.check_rate('d')
+            assert set(limiter._buckets) == {'a', 'b', 'c', 'd'}
+            clock.return_value = 10.0  # Все бакеты полны — они эквивалентны отсутствующим
+            limiter.check_rate('e')
+
+        assert set(limiter._buckets) == {'e'}
+
+    def test_fair_share_concurrency(self):
+        """
+        Тест справедливой доли: при двух активных клиентах каждый получает не больше половины слотов.
+        """
+        limiter = TenantLimiter(UpstreamConfig(max_concurrency=4, acquire_timeout=0.05))
+        assert limiter.acquire('heavy')
+        assert limiter.acquire('heavy')
+        assert limiter.acquire('light')
+
+        assert not limiter.acquire('heavy')  # Свободный слот есть, но доля heavy исчерпана
+        assert limiter.acquire('light')
+
+        limiter.release('light')
+        limiter.release('light')
+        assert limiter.acquire('heavy')  # Клиент снова один — ему доступен весь лимит
+
+
+class TestTenantRoute:
+    """
+    Класс для тестирования учета клиента в роуте и в call_llm.
+    """
+
+    @patch('app.requests.post')
+    def test_call_llm_uses_tenant_key_and_records_usage(self, mock_post):
+        """
+        Тест call_llm: ключ берется из конфигурации клиента, вызов учитывается в статистике.
+        """
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"response": "ok"}
+        mock_post.return_value = mock_response
+        config = UpstreamConfig(['pool_key'], tenant_keys={'vip': 'vip_key'})
+
+        with patch.object(app_module, 'UPSTREAM_CONFIG', config), \
+             patch.object(app_module, '_usage', UsageStore()) as usage:
+            result = call_llm("model", "prompt", tenant='vip')
+
+        assert result == "ok"
+        assert mock_post.call_args.kwargs['headers']['Authorization'] == "Bearer vip_key"
+        assert mock_post.call_args.kwargs['timeout'] == config.request_timeout
+        assert usage.totals('vip')['calls'] == 1
+
+    @pytest.mark.parametrize("headers, tenant", [
+        ({'X-Tenant-Token': 'acme_token'}, 'acme'),
+        ({'X-Tenant-Token': 'acme'}, DEFAULT_TENANT),
+        ({'X-Tenant-ID': 'acme'}, DEFAULT_TENANT),
+    ])
+    @patch('app.call_llm')
+    def test_index_resolves_tenant_from_token(self, mock_call_llm, headers, tenant, client):
+        """
+        Тест роута: клиента определяет секретный токен из X-Tenant-Token, а не имя клиента.
+        """
+        mock_call_llm.side_effect = ["Перевод", "Оценка"]
+        config = UpstreamConfig(['k'], tenant_tokens={'acme_token': 'acme'})
+
+        with patch.object(app_module, 'UPSTREAM_CONFIG', config):
+            response = client.post('/', data={'text': 'Hello', 'language': 'Английский'},
+                                   headers=headers)
+
+        assert response.status_code == 200
+        assert [call.kwargs['tenant'] for call in mock_call_llm.call_args_list] == [tenant, tenant]
+
+    @patch('app.call_llm')
+    def test_index_returns_429_when_rate_limited(self, mock_call_llm, client):
+        """
+        Тест роута: при превышении лимита запросов клиент получает 429, upstream не вызывается.
+        """
+        limiter = TenantLimiter(UpstreamConfig(rate_per_minute=1, burst=1))
+        limiter.check_rate(DEFAULT_TENANT)
+
+        with patch.object(app_module, '_tenant_limiter', limiter):
+            response = client.post('/', data={'text': 'Hello', 'language': 'Английский'})
+
+        assert response.status_code == 429
+        assert "превышен лимит" in response.data.decode('utf-8')
+        mock_call_llm.assert_not_called()
+
+
+# Фикстура для клиента
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    return app.test_client()
@@ -0,0 +1,179 @@
+# Импорт необходимых библиотек для тестирования прогрева и готовности
+import pytest  # Фреймворк для тестирования
+from unittest.mock import patch, MagicMock  # Для мокирования сети
+import json  # Для чтения сохраненного снимка кэша
+import os  # Для построения пути к src
+import subprocess  # Для проверки импорта в чистом интерпретаторе
+import sys  # Для добавления пути
+
+# Добавляем путь к src
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+import app as app_module  # Импорт модуля приложения целиком (нужен доступ к кэшу)
+from app import create_app  # Фабрика приложения
+from warmup import WarmupState  # Состояние прогрева
+
+
+
+@pytest.fixture(autouse=True)
+def isolated_session():
+    """
+    Фикстура изоляции: прогрев создает общую HTTP-сессию на уровне модуля,
+    после теста она сбрасывается, чтобы другие тесты мокали requests.post как раньше.
+    """
+    with patch.object(app_module, '_session', None):
+        yield
+
+
+class TestWarmup:
+    """
+    Класс для тестирования фабрики приложения, прогрева и эндпоинта готовности.
+    Сеть (DNS и соединения) во всех тестах замокана.
+    """
+
+    @patch('warmup.prewarm_connections')
+    @patch('warmup.resolve_host')
+    def test_create_app_warms_up(self, mock_resolve, mock_prewarm):
+        """
+        Тест прогрева: фабрика выполняет все шаги и /ready отвечает 200.
+        """
+        flask_app = create_app({'WARMUP': True, 'WARMUP_CONNECTIONS': 3})
+
+        mock_resolve.assert_called_once_with(app_module.API_ENDPOINT)
+        assert mock_prewarm.call_args.kwargs['count'] == 3
+        # Шаблон уже скомпилирован и лежит в кэше Jinja
+        assert flask_app.jinja_env.cache
+        response = flask_app.test_client().get('/ready')
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'ready'
+        assert set(response.get_json()['steps']) == {'templates', 'dns', 'connections'}
+
+    @patch('warmup.prewarm_connections')
+    @patch('warmup.resolve_host')
+    def test_ready_is_503_while_warming(self, mock_resolve, mock_prewarm):
+        """
+        Тест готовности: пока фоновый прогрев не завершен, /ready отвечает 503.
+        """
+        with patch('app.warm_up') as mock_warm_up:
+            flask_app = create_app({'WARMUP': True, 'WARMUP_BACKGROUND': True})
+            response = flask_app.test_client().get('/ready')
+
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'warming'
+
+    @patch('warmup.prewarm_connections')
+    @patch('warmup.resolve_host')
+    def test_warmup_errors_are_not_fatal(self, mock_resolve, mock_prewarm):
+        """
+        Тест устойчивости: ошибка DNS записывается, но воркер все равно становится готовым.
+        """
+        mock_resolve.side_effect = OSError("DNS недоступен")
+
+        flask_app = create_app({'WARMUP': True})
+        response = flask_app.test_client().get('/ready')
+
+        assert response.status_code == 200
+        assert "DNS недоступен" in response.get_json()['errors']['dns']
+
+    @patch('warmup.prewarm_connections')
+    @patch('warmup.resolve_host')
+    def test_zero_warmup_connections_skips_step(self, mock_resolve, mock_prewarm):
+        """
+        Тест настройки: WARMUP_CONNECTIONS=0 отключает открытие соединений без ошибки в /ready.
+        """
+        flask_app = create_app({'WARMUP': True, 'WARMUP_CONNECTIONS': 0})
+
+        body = flask_app.test_client().get('/ready').get_json()
+        mock_prewarm.assert_not_called()
+        assert body['errors'] == {}
+        assert 'connections' not in body['steps']
+
+    def test_cache_snapshot_roundtrip(self, tmp_path):
+        """
+        Тест снимка кэша: сохраненные ответы загружаются обратно в кэш.
+        """
+        snapshot = str(tmp_path / 'cache.json')
+        with patch.object(app_module, 'RESPONSE_CACHE_SIZE', 10), \
+             patch.object(app_module, '_response_cache', app_module.OrderedDict()):
+            app_module._response_cache['translation@v1:model:abc'] = "Перевод"
+            app_module.save_response_cache(snapshot)
+            app_module._response_cache.clear()
+
+            loaded = app_module.preload_response_cache(snapshot)
+
+            assert loaded == 1
+            assert app_module._response_cache['translation@v1:model:abc'] == "Перевод"
+
+    @patch('warmup.prewarm_connections')
+    @patch('warmup.resolve_host')
+    def test_cache_snapshot_with_disabled_cache_is_reported(self, mock_resolve, mock_prewarm, tmp_path):
+        """
+        Тест снимка кэша: при выключенном кэше шаг 'cache' не считается успешным.
+        """
+        with patch.object(app_module, 'RESPONSE_CACHE_SIZE', 0):
+            flask_app = create_app({'WARMUP': True, 'CACHE_SNAPSHOT': str(tmp_path / 'cache.json')})
+
+        errors = flask_app.test_client().get('/ready').get_json()['errors']
+        assert "RESPONSE_CACHE_SIZE=0" in errors['cache']
+
+    def test_cache_snapshot_is_saved_on_exit(self, tmp_path):
+        """
+        Тест снимка кэша: фабрика регистрирует сохранение снимка при остановке процесса.
+        """
+        snapshot = tmp_path / 'cache.json'
+        with patch.object(app_module, 'RESPONSE_CACHE_SIZE', 10), \
+             patch.object(app_module, '_response_cache', app_module.OrderedDict()), \
+             patch('app.atexit.register') as mock_register:
+            create_app({'WARMUP': False, 'CACHE_SNAPSHOT': str(snapshot)})
+            save_on_exit, path = mock_register.call_args.args
+            app_module._response_cache['translation@v1:model:abc'] = "Перевод"
+
+            save_on_exit(path)
+
+        assert json.loads(snapshot.read_text(encoding='utf-8')) == {'translation@v1:model:abc': "Перевод"}
+
+    def test_import_is_lazy(self):
+        """
+        Тест импорта: импорт модуля app не тянет тяжелые зависимости, не создает
+        приложение и не запускает фоновых потоков.
+        """
+        code = (
+            "import sys, threading, app\n"
+            "heavy = {'requests', 'incremental', 'pipeline'} & set(sys.modules)\n"
+            "assert not heavy, heavy\n"
+            "assert 'app' not in vars(app)\n"
+            "assert [t.name for t in threading.enumerate()] == ['MainThread']\n"
+        )
+        src_dir = os.path.dirname(app_module.__file__)
+        result = subprocess.run([sys.executable, '-c', code], cwd=src_dir,
+                                capture_output=True, text=True)
+
+        assert result.returncode == 0, result.stderr
+
+    def test_concurrent_snapshot_saves_do_not_collide(self, tmp_path):
+        """
+        Тест снимка кэша: одновременные сохранения (несколько воркеров) не делят
+        временный файл и оставляют целый снимок.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from warmup import load_snapshot, save_snapshot
+
+        snapshot = str(tmp_path / 'cache.json')
+        entries = [{f'key{i}': 'x' * 100000} for i in range(8)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda e: save_snapshot(snapshot, e), entries))
+
+        assert load_snapshot(snapshot) in entries
+        assert os.listdir(tmp_path) == ['cache.json']
+
+    def test_run_step_records_error(self):
+        """
+        Тест шага прогрева: исключение превращается в запись об ошибке.
+        """
+        state = WarmupState()
+        state.run_step('broken', MagicMock(side_effect=RuntimeError("boom")))
+
+        assert state.errors == {'broken': 'boom'}
+        assert 'broken' in state.steps
+        assert state.ready is False